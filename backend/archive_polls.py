@@ -0,0 +1,127 @@
+"""
+Archival script.
+Moves the raw vote and like rows of finished polls - closed or expired for
+at least --grace-hours - out of the votes and likes tables into compressed
+archive segments (see services/archive.py), so the hot tables and their
+indexes only hold rows of polls that can still change. Tallies stay on the
+poll and its options; vote lookups, like lookups and exports read the
+archive from then on.
+
+Each poll is archived in its own transaction. Run it periodically, e.g.
+from cron:
+
+    python archive_polls.py
+    python archive_polls.py --grace-hours 1 --limit 500
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from config import settings
+from database import engine
+from models import Poll, Vote, Like, ArchiveSegment
+from repair_counters import recompute_counters
+from services.archive import encode_block
+
+# Columns archived per kind; the session id comes first and orders the blocks
+ARCHIVED_COLUMNS = {
+    "votes": (Vote, [Vote.session_id, Vote.option_id, Vote.voted_at]),
+    "likes": (Like, [Like.session_id, Like.liked_at]),
+}
+
+
+def finished_polls(connection: Connection, cutoff: datetime, limit: int) -> List[int]:
+    """Unarchived polls that closed or expired before cutoff"""
+    return connection.scalars(
+        select(Poll.id)
+        .where(
+            Poll.archived_at.is_(None),
+            or_(
+                and_(Poll.is_active == False, Poll.updated_at <= cutoff),
+                Poll.expires_at <= cutoff
+            )
+        )
+        .order_by(Poll.id)
+        .limit(limit)
+    ).all()
+
+
+def archive_poll(connection: Connection, poll_id: int, block_rows: int) -> Optional[dict]:
+    """
+    Move one poll's votes and likes into archive segments. Returns rows and
+    compressed bytes per kind, or None if the poll was archived already.
+    """
+    # Claim the poll first; this also locks its row on PostgreSQL
+    claimed = connection.execute(
+        update(Poll)
+        .where(Poll.id == poll_id, Poll.archived_at.is_(None))
+        .values(archived_at=datetime.utcnow())
+    ).rowcount
+    if not claimed:
+        return None
+
+    # Final tallies come from the rows, right before they move
+    recompute_counters(connection, poll_id, poll_id, include_archived=True)
+
+    stats = {}
+    for kind, (model, columns) in ARCHIVED_COLUMNS.items():
+        rows = size = 0
+        result = connection.execute(
+            select(*columns)
+            .where(model.poll_id == poll_id)
+            .order_by(model.session_id)
+            .execution_options(yield_per=block_rows)
+        )
+        for partition in result.partitions():
+            block = [
+                [value.isoformat() if isinstance(value, datetime) else value for value in row]
+                for row in partition
+            ]
+            data = encode_block(block)
+            connection.execute(insert(ArchiveSegment).values(
+                poll_id=poll_id,
+                kind=kind,
+                first_session_id=block[0][0],
+                row_count=len(block),
+                data=data
+            ))
+            rows += len(block)
+            size += len(data)
+        connection.execute(delete(model).where(model.poll_id == poll_id))
+        stats[kind] = {"rows": rows, "bytes": size}
+    return stats
+
+
+def archive_finished_polls(grace_hours: float, limit: int, block_rows: int):
+    """Archive up to limit polls that finished more than grace_hours ago."""
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    with engine.connect() as connection:
+        poll_ids = finished_polls(connection, cutoff, limit)
+    print(f"Archiving {len(poll_ids)} finished polls...")
+
+    for poll_id in poll_ids:
+        with engine.begin() as connection:
+            stats = archive_poll(connection, poll_id, block_rows)
+        if stats is None:
+            continue
+        print(f"  poll {poll_id}: " + ", ".join(
+            f"{kind} {kind_stats['rows']} rows -> {kind_stats['bytes']} bytes"
+            for kind, kind_stats in stats.items()
+        ))
+    print("Archival complete!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive the votes and likes of finished polls")
+    parser.add_argument("--grace-hours", type=float, default=settings.ARCHIVE_GRACE_HOURS,
+                        help="only archive polls finished at least this long ago")
+    parser.add_argument("--limit", type=int, default=100, help="polls per run")
+    parser.add_argument("--block-rows", type=int, default=settings.ARCHIVE_BLOCK_ROWS)
+    args = parser.parse_args()
+    archive_finished_polls(args.grace_hours, args.limit, args.block_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Broadcast encoding microbenchmark.
+Measures CPU time to serialize one broadcast for N recipients:
+
+- per-client: json.dumps once per recipient (the old send_json path)
+- once/json: one stdlib json encoding shared by every recipient
+- once/orjson: one orjson encoding shared by every recipient
+- once/msgpack: one msgpack encoding shared by every recipient
+
+Usage (from the backend directory):
+    python benchmarks/bench_encoding.py [--clients 10000] [--rounds 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket import encoding
+from websocket.encoding import EncodedMessage
+
+VOTE_UPDATE = {
+    "type": "vote_update",
+    "data": {"poll_id": 1234, "option_id": 5678, "vote_count": 4321, "total_votes": 98765},
+}
+
+POLL_CREATED = {
+    "type": "poll_created",
+    "data": {
+        "id": 1234,
+        "title": "Which framework should we use for the next project?",
+        "description": "Pick the one you'd be happiest maintaining for the next three years. " * 3,
+        "created_by": "anonymous",
+        "created_at": "2026-10-18T12:00:00.000000",
+        "expires_at": None,
+        "is_active": True,
+        "options": [{"id": i, "option_text": f"Option number {i}", "vote_count": 0} for i in range(6)],
+        "total_votes": 0,
+        "total_likes": 0,
+        "user_voted": False,
+        "user_liked": False,
+        "is_owner": True,
+        "is_expired": False,
+    },
+}
+
+
+def per_client(message, clients):
+    for _ in range(clients):
+        json.dumps(message)
+
+
+def once(wire_encoding, use_orjson=True):
+    def run(message, clients):
+        saved = encoding.orjson
+        if not use_orjson:
+            encoding.orjson = None
+        try:
+            encoded = EncodedMessage(message)
+            for _ in range(clients):
+                encoded.frame(wire_encoding)
+        finally:
+            encoding.orjson = saved
+    return run
+
+
+def cpu_ms_per_broadcast(fn, message, clients, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        fn(message, clients)
+    return (time.process_time() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    strategies = {
+        "per-client": per_client,
+        "once/json": once(encoding.JSON, use_orjson=False),
+    }
+    if encoding.orjson is not None:
+        strategies["once/orjson"] = once(encoding.JSON)
+    if encoding.msgpack is not None:
+        strategies["once/msgpack"] = once(encoding.MSGPACK)
+
+    for name, message in (("vote_update", VOTE_UPDATE), ("poll_created", POLL_CREATED)):
+        print(f"{name} to {args.clients} clients (CPU ms per broadcast)")
+        for strategy, fn in strategies.items():
+            ms = cpu_ms_per_broadcast(fn, message, args.clients, args.rounds)
+            size = len(EncodedMessage(message).frame(encoding.MSGPACK if "msgpack" in strategy else encoding.JSON))
+            print(f"  {strategy:<14} {ms:>9.3f} ms   {size:>5} bytes/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+WebSocket fan-out benchmark.
+Connects N in-process fake clients to a ConnectionManager, makes a few of
+them slow, fires a series of vote updates and prints the manager's fan-out
+statistics (the same numbers served to admins by GET /ws/stats).
+
+Usage (from the backend directory):
+    python benchmarks/bench_fanout.py [--clients 10000] [--broadcasts 100] [--slow 50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from websocket.connection_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; each send costs a little wall time"""
+
+    client = None  # No peer address
+
+    def __init__(self, send_delay: float):
+        self.send_delay = send_delay
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, frame):
+        await asyncio.sleep(self.send_delay)
+        self.sent += 1
+
+    send_bytes = send_text
+
+
+async def run(args):
+    # Every fake client counts against the same (missing) address
+    settings.WS_MAX_CONNECTIONS = settings.WS_MAX_CONNECTIONS_PER_IP = args.clients
+    manager = ConnectionManager()
+    sockets = []
+    for i in range(args.clients):
+        delay = 1.0 if i < args.slow else random.uniform(0, 0.002)
+        websocket = FakeWebSocket(delay)
+        sockets.append(websocket)
+        await manager.connect(websocket, f"client-{i}", poll_ids=[1])
+
+    started = time.perf_counter()
+    for i in range(args.broadcasts):
+        await manager.broadcast_vote_update(poll_id=1, option_id=i % 4, vote_count=i, total_votes=i)
+        await asyncio.sleep(args.interval)
+
+    # Let the fast writers drain
+    while sum(len(client.queue) for client in manager.active_connections.values()) > args.slow * 4:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    stats = manager.stats()
+    print(f"clients={args.clients} broadcasts={args.broadcasts} slow={args.slow} elapsed={elapsed:.2f}s")
+    for key in ("fanout", "delivery", "enqueue"):
+        print(f"{key:>9}: {stats[key]}")
+    print(f"coalesced={stats['coalesced_messages']} evicted={stats['evicted_clients']}")
+
+    for client_id in list(manager.active_connections):
+        manager.disconnect(client_id)
+    await asyncio.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--broadcasts", type=int, default=100)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Membership index benchmark.
+
+1. Memory per million voters: a FingerprintSet of --voters random session
+   ids, against a Python set of the session id strings (tracemalloc).
+2. Lookup cost of MembershipIndex.contains for hits and misses.
+3. Duplicate votes through the API with the index on and off: requests/s
+   and database queries per rejected duplicate.
+
+Usage (from the backend directory):
+    python benchmarks/bench_membership.py [--voters 1000000] [--duplicates 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_membership.db")
+os.environ.setdefault("VOTE_BUFFER_JOURNAL_DIR", tempfile.mkdtemp(prefix="vote_journal_"))
+
+import httpx
+from sqlalchemy import event
+from config import settings
+from database import async_engine
+from init_db import init_database
+from main import app
+from services.membership import FingerprintSet, MembershipIndex, fingerprint, voted
+from utils.rate_limit import limiter
+
+
+def traced(build):
+    """Run build() and return (result, bytes allocated and still held)"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_memory(voters: int):
+    session_ids = [str(uuid.uuid4()) for _ in range(voters)]
+    fingerprints = [fingerprint(session_id) for session_id in session_ids]
+
+    def build_fingerprints():
+        members = FingerprintSet()
+        for value in fingerprints:
+            members.add(value)
+        return members
+
+    members, fingerprint_bytes = traced(build_fingerprints)
+    # Copies the strings too, as sessions read from the database would be
+    _, string_bytes = traced(lambda: {session_id.encode().decode() for session_id in session_ids})
+
+    scale = 1000000 / voters
+    print(f"Memory for {voters} voters (per million voters):")
+    print(f"  FingerprintSet      {fingerprint_bytes / 2**20 * scale:7.1f} MB  "
+          f"({members.nbytes() / voters:.1f} bytes/voter, load {voters / len(members.slots):.2f})")
+    print(f"  set of session ids  {string_bytes / 2**20 * scale:7.1f} MB")
+    return session_ids
+
+
+def bench_lookups(session_ids):
+    index = MembershipIndex("votes")
+    for session_id in session_ids:
+        index.add(1, session_id)
+    misses = [str(uuid.uuid4()) for _ in range(100000)]
+    hits = session_ids[:100000]
+    print("Lookup cost:")
+    for name, probes in (("hit", hits), ("miss", misses)):
+        start = time.perf_counter()
+        for session_id in probes:
+            index.contains(1, session_id)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<4} {elapsed / len(probes) * 1e9:7.0f} ns")
+
+
+async def bench_duplicates(args):
+    init_database()
+    limiter.enabled = False
+    settings.VOTE_BUFFER_ENABLED = False
+    queries = 0
+
+    def count(*_):
+        nonlocal queries
+        queries += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    transport = httpx.ASGITransport(app=app)
+    base_url = "http://quickpoll"
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as creator:
+        poll = (await creator.post("/api/polls/", json={"title": "Duplicates", "options": ["A", "B"]})).json()
+    poll_id, option_id = poll["id"], poll["options"][0]["id"]
+    voters = [f"voter-{poll_id}-{i}" for i in range(100)]
+
+    async def vote(session_id: str) -> int:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, cookies={"session_id": session_id}) as client:
+            response = await client.post(f"/api/polls/{poll_id}/vote", json={"option_id": option_id})
+            return response.status_code
+
+    for session_id in voters:
+        await vote(session_id)
+
+    print(f"{args.duplicates} duplicate votes ({settings.DATABASE_URL}):")
+    for enabled in (False, True):
+        voted.enabled = enabled
+        queries = 0
+        start = time.perf_counter()
+        codes = [await vote(voters[i % len(voters)]) for i in range(args.duplicates)]
+        elapsed = time.perf_counter() - start
+        assert all(code == 400 for code in codes), set(codes)
+        print(f"  index {'on ' if enabled else 'off'}  {args.duplicates / elapsed:7.0f} rejected/s  "
+              f"{queries / args.duplicates:.1f} queries per duplicate")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--voters", type=int, default=1000000)
+    parser.add_argument("--duplicates", type=int, default=2000)
+    args = parser.parse_args()
+
+    session_ids = bench_memory(args.voters)
+    bench_lookups(session_ids)
+    asyncio.run(bench_duplicates(args))
+
+
+if __name__ == "__main__":
+    main()
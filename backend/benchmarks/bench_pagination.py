@@ -0,0 +1,102 @@
+"""
+Pagination benchmark.
+Compares GET /api/polls query latency at page 1 and page 10,000 for offset
+pagination and keyset (cursor) pagination.
+
+Usage (from the backend directory):
+    python benchmarks/bench_pagination.py [--polls 100000] [--page-size 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_pagination.db")
+
+from sqlalchemy import insert, tuple_
+from database import Base, engine, SessionLocal
+from models import Poll
+
+
+def seed(num_polls: int):
+    """Create num_polls polls if the benchmark database is empty"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Poll).count() >= num_polls:
+            return
+        print(f"Seeding {num_polls} polls...")
+        start = datetime(2024, 1, 1)
+        rows = [
+            {"title": f"Poll {i}", "created_by": "bench", "created_at": start + timedelta(seconds=i)}
+            for i in range(num_polls)
+        ]
+        db.execute(insert(Poll), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def offset_page(db, page: int, page_size: int):
+    return (
+        db.query(Poll)
+        .order_by(Poll.created_at.desc(), Poll.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+
+
+def cursor_page(db, cursor, page_size: int):
+    query = db.query(Poll).order_by(Poll.created_at.desc(), Poll.id.desc())
+    if cursor:
+        query = query.filter(tuple_(Poll.created_at, Poll.id) < cursor)
+    return query.limit(page_size).all()
+
+
+def timed(fn, repeat: int = 20) -> float:
+    """Median wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    seed(args.polls)
+    deep_page = args.polls // args.page_size
+
+    db = SessionLocal()
+    try:
+        # Cursor pointing at the last poll of the page before deep_page
+        last = offset_page(db, deep_page - 1, args.page_size)[-1]
+        deep_cursor = (last.created_at, last.id)
+
+        results = {
+            ("offset", 1): timed(lambda: offset_page(db, 1, args.page_size)),
+            ("offset", deep_page): timed(lambda: offset_page(db, deep_page, args.page_size)),
+            ("cursor", 1): timed(lambda: cursor_page(db, None, args.page_size)),
+            ("cursor", deep_page): timed(lambda: cursor_page(db, deep_cursor, args.page_size)),
+            ("count", None): timed(lambda: db.query(Poll).count()),
+        }
+    finally:
+        db.close()
+
+    print(f"{'mode':<8} {'page':>8} {'median ms':>10}")
+    for (mode, page), ms in results.items():
+        print(f"{mode:<8} {page if page else '-':>8} {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Rate limiter microbenchmark.
+Measures the cost of one limiter hit for each storage/strategy pair, with
+hits spread over N distinct client keys, and how many counters each storage
+is holding afterwards:
+
+- memory: limits' stock in-memory storage (unbounded until keys expire)
+- lru-memory: utils.rate_limit.LRUMemoryStorage, capped at --max-keys
+- redis: only if --redis-uri is given
+
+Usage (from the backend directory):
+    python benchmarks/bench_rate_limit.py [--hits 200000] [--keys 50000] [--max-keys 10000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from utils.rate_limit import LRUMemoryStorage
+
+LIMIT = parse("10/minute")
+
+
+def held_keys(storage) -> int:
+    if isinstance(storage, LRUMemoryStorage):
+        return len(storage._counters)
+    if hasattr(storage, "storage"):
+        return len(storage.storage) + len(storage.events)
+    return -1
+
+
+def run(storage, strategy, keys, hits):
+    limiter = STRATEGIES[strategy](storage)
+    clients = [f"client-{i}" for i in range(keys)]
+    sequence = [random.choice(clients) for _ in range(hits)]
+    allowed = 0
+    start = time.perf_counter()
+    for key in sequence:
+        allowed += limiter.hit(LIMIT, key)
+    elapsed = time.perf_counter() - start
+    return elapsed / hits * 1e6, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hits", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=50_000)
+    parser.add_argument("--max-keys", type=int, default=10_000)
+    parser.add_argument("--redis-uri", default=None)
+    args = parser.parse_args()
+
+    storages = {
+        "memory": lambda: storage_from_string("memory://"),
+        "lru-memory": lambda: storage_from_string("lru-memory://", max_keys=args.max_keys),
+    }
+    if args.redis_uri:
+        storages["redis"] = lambda: storage_from_string(args.redis_uri)
+
+    print(f"{args.hits} hits over {args.keys} client keys, limit {LIMIT}")
+    for strategy in ("fixed-window", "sliding-window-counter", "moving-window"):
+        for name, make in storages.items():
+            storage = make()
+            if strategy == "moving-window" and name == "lru-memory":
+                continue  # Not supported by LRUMemoryStorage
+            storage.reset()
+            us, allowed = run(storage, strategy, args.keys, args.hits)
+            print(f"  {strategy:<23} {name:<11} {us:>7.2f} us/hit   {allowed:>7} allowed   {held_keys(storage):>7} keys held")
+
+
+if __name__ == "__main__":
+    main()
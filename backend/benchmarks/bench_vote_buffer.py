@@ -0,0 +1,98 @@
+"""
+Vote throughput benchmark: direct commits vs. the vote buffer.
+Fires N votes (each from a fresh session, --workers at a time) at one poll
+in each mode and reports:
+
+- accepted/s: how fast the endpoint answered (201 direct, 202 buffered)
+- stored/s: how fast votes were actually in the database, i.e. until the
+  buffer had flushed the last one
+
+Works against whatever DATABASE_URL points at (SQLite or PostgreSQL).
+
+Usage (from the backend directory):
+    python benchmarks/bench_vote_buffer.py [--votes 2000] [--workers 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_vote_buffer.db")
+os.environ.setdefault("VOTE_BUFFER_JOURNAL_DIR", tempfile.mkdtemp(prefix="vote_journal_"))
+
+import httpx
+from sqlalchemy import func, select
+from config import settings
+from database import Base, engine, async_engine, AsyncSessionLocal
+from models import Vote
+from main import app
+from services.vote_buffer import vote_buffer
+from utils.rate_limit import limiter
+
+
+async def stored_votes(poll_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(Vote).where(Vote.poll_id == poll_id))
+
+
+async def bench(mode: str, args) -> tuple:
+    settings.VOTE_BUFFER_ENABLED = mode == "buffered"
+    if settings.VOTE_BUFFER_ENABLED:
+        await vote_buffer.start()
+
+    # Count failed requests (e.g. SQLite lock timeouts) instead of aborting
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    base_url = "http://quickpoll"
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as creator:
+        poll = (await creator.post("/api/polls/", json={"title": f"Throughput {mode}", "options": ["A", "B"]})).json()
+    poll_id, option_ids = poll["id"], [option["id"] for option in poll["options"]]
+    limit = asyncio.Semaphore(args.workers)
+
+    async def vote(i: int):
+        cookies = {"session_id": f"{mode}-{i}"}
+        async with limit, httpx.AsyncClient(transport=transport, base_url=base_url, cookies=cookies) as client:
+            response = await client.post(f"/api/polls/{poll_id}/vote", json={"option_id": option_ids[i % 2]})
+            return response.status_code
+
+    start = time.perf_counter()
+    codes = await asyncio.gather(*(vote(i) for i in range(args.votes)))
+    accepted_at = time.perf_counter() - start
+    accepted = len([code for code in codes if code in (201, 202)])
+    while await stored_votes(poll_id) < accepted:
+        await asyncio.sleep(0.005)
+    stored_at = time.perf_counter() - start
+
+    if settings.VOTE_BUFFER_ENABLED:
+        await vote_buffer.stop()
+    return accepted / accepted_at, accepted / stored_at, args.votes - accepted
+
+
+async def main_async(args):
+    results = {}
+    for mode in ("direct", "buffered"):
+        results[mode] = await bench(mode, args)
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    limiter.enabled = False
+
+    results = asyncio.run(main_async(args))
+    print(f"{args.votes} votes, {args.workers} concurrent clients ({settings.DATABASE_URL})")
+    for mode, (accepted, stored, rejected) in results.items():
+        print(f"  {mode:<9} {accepted:>9.0f} accepted/s  {stored:>9.0f} stored/s  {rejected} rejected")
+
+
+if __name__ == "__main__":
+    main()
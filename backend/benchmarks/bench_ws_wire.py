@@ -0,0 +1,207 @@
+"""
+WebSocket wire-cost benchmark.
+
+Streams --events events (1 in 5 a poll_created carrying a full poll, the
+rest vote_updates) at --rate events/s to one feed client, for each
+combination of permessage-deflate (thresholded, see
+websocket/compression.py) and micro-batching (?batch=1), and reports per
+1,000 events:
+
+- frames received by the client
+- write syscalls and bytes written by the server process (/proc/self/io)
+- server CPU time
+
+The server runs in a subprocess on uvloop, whose socket writes are
+write()/writev() calls and so show up in /proc/<pid>/io. Linux only.
+
+Usage (from the backend directory):
+    python benchmarks/bench_ws_wire.py [--events 5000] [--rate 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from config import settings
+
+PORT = 8766
+POLL_IDS = list(range(1, 11))
+
+
+def poll_created(i: int) -> dict:
+    return {
+        "type": "poll_created",
+        "data": {
+            "id": 10000 + i,
+            "title": f"Which framework should we use for project {i}?",
+            "description": "Pick the one you'd be happiest maintaining for the next three years.",
+            "created_by": "anonymous",
+            "created_at": "2026-10-18T12:00:00.000000",
+            "expires_at": None,
+            "is_active": True,
+            "options": [{"id": i * 10 + j, "option_text": f"Option number {j}", "vote_count": 0} for j in range(4)],
+            "total_votes": 0,
+            "total_likes": 0,
+            "user_voted": False,
+            "user_liked": False,
+        },
+    }
+
+
+def vote_update(i: int) -> dict:
+    # A distinct option per event, so queued updates never coalesce
+    return {
+        "type": "vote_update",
+        "data": {"poll_id": POLL_IDS[i % len(POLL_IDS)], "option_id": i, "vote_count": i, "total_votes": 2 * i},
+    }
+
+
+def read_io() -> dict:
+    with open("/proc/self/io") as io:
+        return {key: int(value) for key, value in (line.split(": ") for line in io)}
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def serve(args):
+    """Subprocess side: run the API and stream events to the first client"""
+    import uvicorn
+    from init_db import init_database
+    from main import app
+    from websocket.compression import DeflateWebSocketProtocol
+    from websocket.connection_manager import manager
+
+    init_database()
+    config = uvicorn.Config(
+        app, port=args.port, log_level="warning",
+        ws=DeflateWebSocketProtocol, ws_per_message_deflate=True
+    )
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+
+    while not manager.active_connections:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.5)
+
+    io_before, cpu_before = read_io(), cpu_seconds()
+    start = time.perf_counter()
+    for i in range(args.events):
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await manager.publish(poll_created(i) if i % 5 == 0 else vote_update(i))
+    while any(client.queue for client in manager.active_connections.values()):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.2)
+    io_after, cpu_after = read_io(), cpu_seconds()
+
+    print("RESULT " + json.dumps({
+        "syscalls": io_after["syscw"] - io_before["syscw"],
+        "bytes": io_after["wchar"] - io_before["wchar"],
+        "cpu": cpu_after - cpu_before,
+    }), flush=True)
+    await serving
+
+
+async def receive(args, deflate: bool, batch: bool) -> int:
+    """Client side: count frames until every event has arrived"""
+    import websockets
+
+    query = f"polls={','.join(map(str, POLL_IDS))}" + ("&batch=1" if batch else "")
+    async with websockets.connect(
+        f"ws://127.0.0.1:{args.port}/ws?{query}",
+        compression="deflate" if deflate else None,
+        max_queue=None
+    ) as ws:
+        json.loads(await ws.recv())  # Welcome
+        frames = events = 0
+        while events < args.events:
+            payload = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+            frames += 1
+            events += len(payload) if isinstance(payload, list) else 1
+        return frames
+
+
+def run(args, deflate: bool, batch: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_ws_wire_")
+    log_path = os.path.join(workdir, "server.log")
+    log = open(log_path, "w")
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(args.port),
+         "--events", str(args.events), "--rate", str(args.rate)],
+        cwd=BACKEND,
+        stdout=subprocess.PIPE,
+        stderr=log,
+        text=True,
+        env={
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "VOTE_BUFFER_ENABLED": "false",
+            "WS_BACKPLANE": "memory",
+            "WS_COALESCE_WINDOW_MS": "0",
+            "WS_SEND_QUEUE_SIZE": "100000",
+            "WS_DEFLATE_MIN_BYTES": str(args.deflate_min_bytes),
+        },
+    )
+    try:
+        for _ in range(100):
+            try:
+                frames = asyncio.run(receive(args, deflate, batch))
+                break
+            except OSError:
+                if server.poll() is not None:
+                    sys.exit(f"API server failed to start, see {log_path}")
+                time.sleep(0.1)
+        else:
+            sys.exit("API server did not start in time")
+        for line in server.stdout:
+            if line.startswith("RESULT "):
+                return {"frames": frames, **json.loads(line[len("RESULT "):])}
+        sys.exit(f"API server exited without a result, see {log_path}")
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=2000, help="events per second")
+    parser.add_argument("--deflate-min-bytes", type=int, default=settings.WS_DEFLATE_MIN_BYTES)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(serve(args))
+        return
+
+    scale = 1000 / args.events
+    print(f"{args.events} events at {args.rate:.0f}/s, per 1,000 events "
+          f"(deflate from {args.deflate_min_bytes} bytes):")
+    print(f"  {'deflate':<8} {'batch':<6} {'frames':>7} {'syscalls':>9} {'KB written':>11} {'CPU ms':>7}")
+    for deflate in (False, True):
+        for batch in (False, True):
+            result = run(args, deflate, batch)
+            print(f"  {'on' if deflate else 'off':<8} {'on' if batch else 'off':<6} "
+                  f"{result['frames'] * scale:7.0f} {result['syscalls'] * scale:9.0f} "
+                  f"{result['bytes'] * scale / 1024:11.1f} {result['cpu'] * scale * 1000:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
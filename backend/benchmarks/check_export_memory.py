@@ -0,0 +1,155 @@
+"""
+Export memory check.
+Seeds a poll with --votes votes (1,000,000 by default), starts the API in a
+uvicorn subprocess and downloads GET /api/polls/{id}/export in each format
+while sampling the server's anonymous resident memory (RssAnon). Fails if
+its peak grows by more than --max-growth-mb over the idle server, i.e. if the
+export buffers the votes instead of streaming them. File-backed pages are
+left out: with SQLite's mmap_size the database file itself shows up in VmRSS
+as it is read, but the kernel can drop those pages at any time.
+
+Linux only (reads /proc). Works against whatever DATABASE_URL points at
+(SQLite or PostgreSQL).
+
+Usage (from the backend directory):
+    python benchmarks/check_export_memory.py [--votes 1000000] [--max-growth-mb 64]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_export_memory.db")
+
+import httpx
+from sqlalchemy import func, insert, select
+from database import Base, engine
+from models import Poll, PollOption, Vote
+
+OWNER = "export-memory-check"
+PORT = 8765
+
+
+def seed(num_votes: int) -> int:
+    """Create the benchmark poll with num_votes votes unless it exists; returns its id"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        poll_id = connection.scalar(select(Poll.id).where(Poll.owner_session_id == OWNER))
+        if poll_id and connection.scalar(select(func.count()).select_from(Vote).where(Vote.poll_id == poll_id)) >= num_votes:
+            return poll_id
+
+        print(f"Seeding {num_votes} votes...")
+        poll_id = connection.execute(insert(Poll).values(
+            title="Export memory check", created_by="bench", owner_session_id=OWNER,
+            total_votes=num_votes
+        )).inserted_primary_key[0]
+        option_ids = [
+            connection.execute(insert(PollOption).values(
+                poll_id=poll_id, option_text=f"Option {i}", vote_count=num_votes // 4
+            )).inserted_primary_key[0]
+            for i in range(4)
+        ]
+        start = datetime(2024, 1, 1)
+        for first in range(0, num_votes, 50000):
+            connection.execute(insert(Vote), [
+                {
+                    "poll_id": poll_id,
+                    "option_id": option_ids[i % 4],
+                    "session_id": f"voter-{i}",
+                    "voted_at": start + timedelta(seconds=i),
+                }
+                for i in range(first, min(first + 50000, num_votes))
+            ])
+    return poll_id
+
+
+def rss_mb(pid: int, field: str = "RssAnon") -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def download(client: httpx.Client, poll_id: int, fmt: str, pid: int) -> tuple:
+    """Stream one export to nowhere; returns (rows, bytes, seconds, peak RssAnon MB)"""
+    peak = rss_mb(pid)
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_mb(pid))
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    lines = size = 0
+    try:
+        with client.stream("GET", f"/api/polls/{poll_id}/export", params={"format": fmt}) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+    finally:
+        done.set()
+        sampler.join()
+    rows = lines - 1 if fmt == "csv" else lines
+    return rows, size, time.perf_counter() - start, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument("--max-growth-mb", type=float, default=64.0)
+    args = parser.parse_args()
+
+    poll_id = seed(args.votes)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BACKEND,
+        env={**os.environ, "VOTE_BUFFER_ENABLED": "false", "WS_BACKPLANE": "memory"}
+    )
+    failed = False
+    try:
+        client = httpx.Client(base_url=f"http://127.0.0.1:{PORT}", cookies={"session_id": OWNER}, timeout=600)
+        for _ in range(100):
+            try:
+                client.get(f"/api/polls/{poll_id}").raise_for_status()
+                break
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    sys.exit("API server failed to start")
+                time.sleep(0.1)
+        else:
+            sys.exit("API server did not start in time")
+        baseline = rss_mb(server.pid)
+
+        print(f"{args.votes} votes, idle server RssAnon {baseline:.0f} MB ({os.environ['DATABASE_URL']})")
+        for fmt in ("csv", "ndjson"):
+            rows, size, seconds, peak = download(client, poll_id, fmt, server.pid)
+            growth = peak - baseline
+            ok = rows == args.votes and growth <= args.max_growth_mb
+            failed = failed or not ok
+            print(f"  {fmt:<7} {rows} rows  {size / 2**20:7.1f} MB in {seconds:5.1f}s  "
+                  f"peak RssAnon +{growth:.1f} MB  {'OK' if ok else 'FAIL'}")
+        client.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    if failed:
+        print(f"Export memory check failed (limit +{args.max_growth_mb:.0f} MB, {args.votes} rows expected)")
+        sys.exit(1)
+    print("Export memory stays bounded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Query plan check.
+Runs EXPLAIN on the hot vote, like and poll lookups and fails if any of them
+would scan a table instead of using an index.
+
+Works against whatever DATABASE_URL points at (SQLite or PostgreSQL). Run
+init_db.py first so the migrations have created the indexes.
+
+Usage (from the backend directory):
+    python benchmarks/check_query_plans.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./quickpoll.db")
+
+from sqlalchemy import text
+from database import engine
+
+LOOKUPS = {
+    "vote by session": "SELECT id, option_id FROM votes WHERE poll_id = 1 AND session_id = 's'",
+    "like by session": "SELECT id FROM likes WHERE poll_id = 1 AND session_id = 's'",
+    "poll by id": "SELECT * FROM polls WHERE id = 1",
+    "options of poll": "SELECT * FROM poll_options WHERE poll_id = 1",
+    "option of poll": "SELECT id FROM poll_options WHERE id = 1 AND poll_id = 1",
+    "votes of option": "SELECT id FROM votes WHERE option_id = 1",
+    "poll page by cursor": (
+        "SELECT * FROM polls WHERE (created_at, id) < ('2024-01-01', 1) "
+        "ORDER BY created_at DESC, id DESC LIMIT 10"
+    ),
+}
+
+
+def explain(connection, sql: str) -> str:
+    if connection.dialect.name == "postgresql":
+        return "\n".join(row[0] for row in connection.execute(text(f"EXPLAIN {sql}")))
+    return "\n".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def uses_index(dialect: str, plan: str) -> bool:
+    if dialect == "postgresql":
+        return "Seq Scan" not in plan and "Index" in plan
+    # SQLite reports "SCAN <table>" for full scans and "SEARCH ... USING ... INDEX" otherwise
+    return all(
+        line.startswith("SEARCH") or "USING" in line and "INDEX" in line
+        for line in plan.splitlines()
+        if line.startswith(("SCAN", "SEARCH"))
+    )
+
+
+def main():
+    failures = []
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Tiny test tables make sequential scans look cheaper than they are
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, sql in LOOKUPS.items():
+            plan = explain(connection, sql)
+            ok = uses_index(connection.dialect.name, plan)
+            print(f"[{'ok' if ok else 'FAIL'}] {name}: {plan.splitlines()[0]}")
+            if not ok:
+                failures.append(name)
+
+    if failures:
+        print(f"Lookups not using an index: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
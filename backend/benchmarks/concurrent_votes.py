@@ -0,0 +1,82 @@
+"""
+Concurrent voting check.
+Fires N parallel votes (each from a fresh session) plus a burst of duplicate
+votes from a single session at one poll, then verifies that the counters
+match exactly: N + 1 increments, no lost updates and no double votes.
+
+Works against whatever DATABASE_URL points at (SQLite or PostgreSQL).
+
+Usage (from the backend directory):
+    python benchmarks/concurrent_votes.py [--votes 200] [--workers 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_concurrent_votes.db")
+
+import httpx
+from database import Base, engine, SessionLocal, async_engine
+from models import Poll, PollOption, Vote
+from main import app
+from routers import polls, votes, likes
+import main
+
+
+async def fire(args):
+    transport = httpx.ASGITransport(app=app)
+    base_url = "http://quickpoll"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as creator:
+        poll = (await creator.post("/api/polls/", json={"title": "Concurrency", "options": ["A", "B"]})).json()
+    poll_id, option_id = poll["id"], poll["options"][0]["id"]
+    limit = asyncio.Semaphore(args.workers)
+
+    async def vote(session_id=None):
+        cookies = {"session_id": session_id} if session_id else None
+        async with limit, httpx.AsyncClient(transport=transport, base_url=base_url, cookies=cookies) as client:
+            response = await client.post(f"/api/polls/{poll_id}/vote", json={"option_id": option_id})
+            return response.status_code
+
+    fresh = await asyncio.gather(*(vote() for _ in range(args.votes)))
+    duplicates = await asyncio.gather(*(vote("duplicate-session") for _ in range(args.workers)))
+    await async_engine.dispose()
+    return poll_id, option_id, fresh, duplicates
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    for module in (main, polls, votes, likes):
+        module.limiter.enabled = False
+
+    poll_id, option_id, fresh, duplicates = asyncio.run(fire(args))
+
+    db = SessionLocal()
+    try:
+        vote_count = db.query(PollOption.vote_count).filter(PollOption.id == option_id).scalar()
+        total_votes = db.query(Poll.total_votes).filter(Poll.id == poll_id).scalar()
+        vote_rows = db.query(Vote).filter(Vote.poll_id == poll_id).count()
+    finally:
+        db.close()
+
+    expected = args.votes + 1
+    print(f"fresh votes accepted:     {fresh.count(201)}/{args.votes}")
+    print(f"duplicate votes accepted: {duplicates.count(201)}/{args.workers}")
+    print(f"vote rows={vote_rows} option.vote_count={vote_count} poll.total_votes={total_votes}")
+
+    assert fresh.count(201) == args.votes, "some fresh votes were rejected"
+    assert duplicates.count(201) == 1, "duplicate session voted more than once"
+    assert vote_rows == vote_count == total_votes == expected, "lost or extra increments"
+    print("OK")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,213 @@
+"""
+Bulk import script.
+Loads polls, options, votes and likes from an NDJSON or CSV file in large
+batches, e.g. results migrated from offline ballots or other tools.
+
+Every record has a "type" (poll, option, vote or like) and that table's
+columns; CSV files use one header row with the union of the columns and
+leave the others empty. Polls and options need explicit ids so that later
+records can reference them, and parents must come before their children:
+
+    {"type": "poll", "id": 1001, "title": "Lunch?", "created_at": "2024-05-01T12:00:00"}
+    {"type": "option", "id": 5001, "poll_id": 1001, "option_text": "Pizza"}
+    {"type": "vote", "poll_id": 1001, "option_id": 5001, "session_id": "ballot-17"}
+    {"type": "like", "poll_id": 1001, "session_id": "ballot-17"}
+
+The file is streamed and at most --chunk-size rows per table are held in
+memory. Rows go in with COPY on PostgreSQL and chunked executemany on
+SQLite, all in one transaction, so a bad record (a duplicate vote, or a
+vote or like for an archived poll) rolls the whole import back. Vote and like counters and the timeline
+rollups are recomputed once at the end.
+
+Usage:
+    python bulk_import.py data.ndjson
+    python bulk_import.py data.csv --format csv --chunk-size 10000
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Dict, IO, Iterator, List
+from sqlalchemy import Boolean, DateTime, Integer, insert, select, text
+from database import engine, IS_SQLITE
+from models import Poll, PollOption, Vote, Like
+from repair_counters import recompute_counters, rebuild_rollups
+
+# Columns written per record type, in insert order. Counters start at 0
+# and are recomputed after the load.
+TABLES = {
+    "poll": (Poll.__table__, [
+        "id", "title", "description", "created_by", "owner_session_id", "created_at",
+        "updated_at", "expires_at", "is_active", "total_votes", "total_likes"
+    ]),
+    "option": (PollOption.__table__, ["id", "poll_id", "option_text", "vote_count"]),
+    "vote": (Vote.__table__, ["poll_id", "option_id", "session_id", "voted_at"]),
+    "like": (Like.__table__, ["poll_id", "session_id", "liked_at"]),
+}
+
+REQUIRED = {
+    "poll": ["id", "title"],
+    "option": ["id", "poll_id", "option_text"],
+    "vote": ["poll_id", "option_id", "session_id"],
+    "like": ["poll_id", "session_id"],
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """Yield raw records from an NDJSON or CSV text stream"""
+    if fmt == "csv":
+        for record in csv.DictReader(stream):
+            yield {key: value for key, value in record.items() if value not in ("", None)}
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def normalize(record: dict, line: int) -> tuple:
+    """Validate a record and convert its values to the column types"""
+    record_type = record.get("type")
+    if record_type not in TABLES:
+        raise ValueError(f"Record {line}: unknown type {record_type!r}")
+    missing = [column for column in REQUIRED[record_type] if record.get(column) in (None, "")]
+    if missing:
+        raise ValueError(f"Record {line}: {record_type} is missing {', '.join(missing)}")
+
+    now = datetime.utcnow()
+    defaults = {
+        "created_by": "anonymous", "created_at": now, "updated_at": now, "is_active": True,
+        "total_votes": 0, "total_likes": 0, "vote_count": 0, "voted_at": now, "liked_at": now,
+    }
+    table, columns = TABLES[record_type]
+    row = {}
+    for column in columns:
+        value = record.get(column, defaults.get(column))
+        column_type = table.c[column].type
+        if isinstance(value, str):
+            if isinstance(column_type, Integer):
+                value = int(value)
+            elif isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Boolean):
+                value = value.strip().lower() in ("1", "true", "t", "yes")
+        row[column] = value
+    return record_type, row
+
+
+class Importer:
+    """Buffers rows per table and writes them in chunks on one connection"""
+
+    def __init__(self, connection, chunk_size: int):
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.buffers: Dict[str, List[dict]] = {record_type: [] for record_type in TABLES}
+        self.counts: Dict[str, int] = {record_type: 0 for record_type in TABLES}
+        self.first_poll_id = None
+        self.last_poll_id = None
+
+    def add(self, record_type: str, row: dict):
+        poll_id = row["id"] if record_type == "poll" else row["poll_id"]
+        self.first_poll_id = poll_id if self.first_poll_id is None else min(self.first_poll_id, poll_id)
+        self.last_poll_id = poll_id if self.last_poll_id is None else max(self.last_poll_id, poll_id)
+
+        self.buffers[record_type].append(row)
+        if len(self.buffers[record_type]) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffer, parents first so foreign keys resolve"""
+        self._check_not_archived()
+        for record_type, rows in self.buffers.items():
+            if not rows:
+                continue
+            table, columns = TABLES[record_type]
+            if IS_SQLITE:
+                self.connection.execute(insert(table), rows)
+            else:
+                self._copy(table.name, columns, rows)
+            self.counts[record_type] += len(rows)
+            rows.clear()
+
+    def _check_not_archived(self):
+        """Archived polls keep their votes and likes in the archive only"""
+        poll_ids = {row["poll_id"] for record_type in ("vote", "like") for row in self.buffers[record_type]}
+        if not poll_ids:
+            return
+        archived = self.connection.scalars(
+            select(Poll.id)
+            .where(Poll.id.between(min(poll_ids), max(poll_ids)), Poll.archived_at.isnot(None))
+        )
+        for poll_id in archived:
+            if poll_id in poll_ids:
+                raise ValueError(f"Poll {poll_id} is archived; its votes and likes can't be imported")
+
+    def _copy(self, table_name: str, columns: List[str], rows: List[dict]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if row[column] is None else row[column] for column in columns])
+        buffer.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def finish(self):
+        self.flush()
+        if self.first_poll_id is not None:
+            recompute_counters(self.connection, self.first_poll_id, self.last_poll_id)
+            rebuild_rollups(self.connection, self.first_poll_id, self.last_poll_id)
+        if not IS_SQLITE:
+            # Explicit ids bypass the sequences; move them past the new rows
+            for table_name in ("polls", "poll_options"):
+                self.connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table_name}))"
+                ))
+
+
+def import_stream(stream: IO[str], fmt: str = "ndjson", chunk_size: int = DEFAULT_CHUNK_SIZE) -> Importer:
+    """Import every record in the stream in one transaction; importer.counts has the rows per type"""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    with engine.begin() as connection:
+        importer = Importer(connection, chunk_size)
+        for line, record in enumerate(read_records(stream, fmt), start=1):
+            importer.add(*normalize(record, line))
+        importer.finish()
+    return importer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import polls, options, votes and likes")
+    parser.add_argument("path", help="NDJSON or CSV file, or - for stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None,
+                        help="defaults to the file extension, else ndjson")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    print(f"Importing {args.path} ({fmt})...")
+    if args.path == "-":
+        importer = import_stream(sys.stdin, fmt, args.chunk_size)
+    else:
+        with open(args.path, newline="", encoding="utf-8") as stream:
+            importer = import_stream(stream, fmt, args.chunk_size)
+    print("Imported " + ", ".join(f"{count} {record_type}s" for record_type, count in importer.counts.items()))
+
+
+if __name__ == "__main__":
+    main()
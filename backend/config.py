@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
-from typing import List, Any
+from typing import List, Any, Optional
 import os
 
 
@@ -14,10 +14,26 @@ class Settings(BaseSettings):
     # Database - Railway provides DATABASE_URL automatically
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./quickpoll.db")
     
+    # Database connection pool (PostgreSQL)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Replace connections before proxies drop them
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 5000  # API (async engine) only; 0 disables the server-side timeout
+    DB_POOL_WARMUP_CONNECTIONS: int = 5  # Connections opened at startup
+    
+    # SQLite performance profile
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = int(os.getenv("PORT", 8000))
     API_RELOAD: bool = os.getenv("ENVIRONMENT", "development") == "development"
+    # Proxies trusted for X-Forwarded-For (comma-separated, or * behind a hosted
+    # load balancer); the client address used by rate limits and WS caps
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
     
     # CORS - will be parsed from string to list
     CORS_ORIGINS: Any = os.getenv(
@@ -25,6 +41,57 @@ class Settings(BaseSettings):
         "http://localhost:3000,http://127.0.0.1:3000"
     )
     
+    # Pagination - how long the cached poll count may be served before recounting
+    POLL_COUNT_CACHE_TTL_SECONDS: float = 5.0
+    
+    # Rate limiting - lru-memory:// is per worker, redis://... is shared
+    RATE_LIMIT_STORAGE_URI: str = os.getenv("RATE_LIMIT_STORAGE_URI", "lru-memory://")
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter"  # or fixed-window
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Clients tracked per worker with lru-memory://
+    
+    # Buffered votes - accept with 202 and batch-insert in the background
+    VOTE_BUFFER_ENABLED: bool = os.getenv("VOTE_BUFFER_ENABLED", "false").lower() == "true"
+    VOTE_BUFFER_FLUSH_MS: int = 50  # Flush at least this often...
+    VOTE_BUFFER_MAX_BATCH: int = 500  # ...or as soon as this many votes are queued
+    VOTE_BUFFER_JOURNAL_DIR: str = os.getenv("VOTE_BUFFER_JOURNAL_DIR", "./vote_journal")
+    
+    # Admin API (bulk import); disabled unless set
+    ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN")
+    
+    # Vote export
+    EXPORT_CHUNK_ROWS: int = 1000  # Rows fetched from the cursor and sent per chunk
+    EXPORT_HASH_KEY: Optional[str] = os.getenv("EXPORT_HASH_KEY")  # Keys the voter hashes
+    
+    # In-memory "already voted/liked" index (services/membership.py)
+    MEMBERSHIP_INDEX_ENABLED: bool = True
+    
+    # Archive of finished polls' votes and likes (archive_polls.py)
+    ARCHIVE_GRACE_HOURS: float = 24.0  # Archive polls closed or expired at least this long ago
+    ARCHIVE_BLOCK_ROWS: int = 1000  # Rows per compressed archive segment
+    
+    # Poll snapshot cache
+    POLL_CACHE_TTL_SECONDS: float = 30.0
+    POLL_CACHE_MAX_ENTRIES: int = 10000
+    POLL_CACHE_URL: Optional[str] = os.getenv("POLL_CACHE_URL")  # redis:// to share between workers
+    
+    # WebSocket
+    WS_MAX_SUBSCRIPTIONS: int = 200  # Polls a single client may subscribe to
+    WS_MAX_CONNECTIONS: int = 10000  # Per worker; further handshakes are rejected
+    WS_MAX_CONNECTIONS_PER_IP: int = 0  # Per worker and client address; 0 disables. Set FORWARDED_ALLOW_IPS first behind a proxy
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25.0  # Ping clients that were silent this long
+    WS_HEARTBEAT_TIMEOUT_SECONDS: float = 60.0  # Reap clients silent this long (no pong)
+    WS_SEND_QUEUE_SIZE: int = 64  # Outbound messages buffered per client before eviction
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # A single send slower than this drops the client
+    WS_COALESCE_WINDOW_MS: int = 100  # Max one update per poll per window under load; 0 disables
+    WS_REPLAY_BUFFER_SIZE: int = 4096  # Recent events kept for clients resuming after a reconnect
+    WS_DEFLATE_ENABLED: bool = True  # Negotiate permessage-deflate (see serve.py)
+    WS_DEFLATE_MIN_BYTES: int = 64  # Messages smaller than this are sent uncompressed
+    WS_BATCH_WINDOW_MS: int = 5  # Clients connecting with ?batch=1 get events this close together in one frame; 0 disables
+    WS_BATCH_MAX_MESSAGES: int = 32  # Max events per batched frame
+    WS_BACKPLANE: str = os.getenv("WS_BACKPLANE", "auto")  # auto, memory, unix or postgres
+    WS_BACKPLANE_CHANNEL: str = "quickpoll_events"  # LISTEN/NOTIFY channel
+    WS_BACKPLANE_SOCKET: str = os.getenv("WS_BACKPLANE_SOCKET", "/tmp/quickpoll-backplane.sock")
+    
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
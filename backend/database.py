@@ -1,25 +1,116 @@
-from sqlalchemy import create_engine
+import asyncio
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.dialects import postgresql, sqlite
 from config import settings
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def engine_options(is_async: bool) -> dict:
+    """Pool and connection options for create_engine/create_async_engine"""
+    if IS_SQLITE:
+        options = {"connect_args": {"check_same_thread": False}} if not is_async else {}
+        if ":memory:" in settings.DATABASE_URL:
+            return options
+        # aiosqlite defaults to opening a new connection per checkout; keep a
+        # pool so connections (and their PRAGMAs) are reused
+        options.update(
+            poolclass=AsyncAdaptedQueuePool if is_async else QueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+        return options
+    
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # Only API requests are bounded; the sync engine runs batch scripts and
+    # the admin import, which legitimately take longer
+    if settings.DB_STATEMENT_TIMEOUT_MS and is_async:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers proceed while a writer
+    commits, synchronous=NORMAL is durable under WAL while skipping an fsync
+    per commit, and busy_timeout makes writers wait instead of failing.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}")
+    cursor.close()
+
+
+# Create sync database engine (used by scripts and migrations)
+engine = create_engine(settings.DATABASE_URL, **engine_options(is_async=False))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async database engine (used by the API)
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    **engine_options(is_async=True)
+)
+
+# Create AsyncSessionLocal class. Objects stay usable after commit so
+# responses can be built without another round trip.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
 # Create Base class for models
 Base = declarative_base()
 
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def warm_up_pool(connections: int):
+    """
+    Open connections up front so the first requests after a deploy don't pay
+    for TCP/TLS setup and authentication. They are returned to the pool open.
+    """
+    async def ping():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+def dialect_insert(model):
+    """
+    Return an INSERT construct for the configured database dialect.
+    Unlike the generic insert(), it supports ON CONFLICT clauses.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -1,17 +1,35 @@
 """
 Database initialization script.
-Run this to create all tables in the database.
+Run this to create or upgrade all tables in the database.
+
+Schema changes are versioned Alembic migrations in migrations/versions.
+Databases created before migrations existed are stamped at the baseline
+revision first, then upgraded like any other database.
 """
 
-from database import Base, engine
-from models import Poll, PollOption, Vote, Like
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+BASELINE_REVISION = "0001"
 
 
 def init_database():
-    """Create all database tables."""
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    """Apply all pending migrations."""
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+
+    tables = inspect(engine).get_table_names()
+    if "polls" in tables and "alembic_version" not in tables:
+        print("Existing unversioned database found, stamping baseline revision...")
+        command.stamp(alembic_config, BASELINE_REVISION)
+
+    print("Applying database migrations...")
+    command.upgrade(alembic_config, "head")
+    print("Database is up to date!")
 
 
 if __name__ == "__main__":
@@ -1,18 +1,48 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from config import settings
-from routers import polls_router, votes_router, likes_router, websocket_router
+from database import async_engine, warm_up_pool
+from routers import polls_router, votes_router, likes_router, websocket_router, admin_router
+from utils.rate_limit import limiter
+from services.poll_cache import poll_cache
+from services.poll_snapshots import load_cached_poll_counts, load_poll_counts
+from services.vote_buffer import vote_buffer
+from services.expiry import expiry_scheduler
+from services import membership
+from websocket.backplane import create_backplane
+from websocket.connection_manager import manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown hooks"""
+    await warm_up_pool(settings.DB_POOL_WARMUP_CONNECTIONS)
+    await membership.load_membership()
+    manager.snapshot_loader = load_poll_counts
+    manager.resume_snapshot_loader = load_cached_poll_counts
+    manager.listeners.append(poll_cache.apply_event)
+    manager.listeners.append(expiry_scheduler.apply_event)
+    manager.listeners.append(membership.apply_event)
+    await manager.start(create_backplane())
+    await expiry_scheduler.start()
+    if settings.VOTE_BUFFER_ENABLED:
+        await vote_buffer.start()
+    yield
+    if settings.VOTE_BUFFER_ENABLED:
+        await vote_buffer.stop()
+    await expiry_scheduler.stop()
+    await manager.stop()
+    await async_engine.dispose()
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
 
 app = FastAPI(
     title="QuickPoll API",
     description="Real-time polling platform API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add rate limiter to app state
@@ -33,6 +63,7 @@ app.include_router(polls_router)
 app.include_router(votes_router)
 app.include_router(likes_router)
 app.include_router(websocket_router)
+app.include_router(admin_router)
 
 @app.get("/")
 @limiter.limit("10/minute")
@@ -0,0 +1,33 @@
+"""
+Helpers for schema changes that must not block a live database.
+
+On PostgreSQL, indexes are built with CREATE INDEX CONCURRENTLY outside the
+migration transaction, so reads and writes keep flowing while they build.
+Other databases (SQLite in development) get a plain CREATE INDEX.
+"""
+
+from alembic import op
+
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_online(name, table, columns, unique=False):
+    """Create an index without holding a write lock on PostgreSQL."""
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            # A previous failed CONCURRENTLY build leaves an INVALID index behind
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+    else:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def drop_index_online(name, table):
+    """Drop an index without holding a write lock on PostgreSQL."""
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
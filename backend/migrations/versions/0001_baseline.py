@@ -0,0 +1,72 @@
+"""Baseline schema: polls, poll options, votes and likes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created before migrations existed (via Base.metadata.create_all)
+already have these tables; init_db.py stamps them at this revision instead
+of running it.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "polls",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("created_by", sa.String(100), nullable=True),
+        sa.Column("owner_session_id", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_polls_id", "polls", ["id"])
+
+    op.create_table(
+        "poll_options",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("poll_id", sa.Integer(), sa.ForeignKey("polls.id"), nullable=False),
+        sa.Column("option_text", sa.String(200), nullable=False),
+        sa.Column("vote_count", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_poll_options_id", "poll_options", ["id"])
+
+    op.create_table(
+        "votes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("poll_id", sa.Integer(), sa.ForeignKey("polls.id"), nullable=False),
+        sa.Column("option_id", sa.Integer(), sa.ForeignKey("poll_options.id"), nullable=False),
+        sa.Column("session_id", sa.String(100), nullable=False),
+        sa.Column("voted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_votes_id", "votes", ["id"])
+    op.create_index("ix_votes_session_id", "votes", ["session_id"])
+
+    op.create_table(
+        "likes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("poll_id", sa.Integer(), sa.ForeignKey("polls.id"), nullable=False),
+        sa.Column("session_id", sa.String(100), nullable=False),
+        sa.Column("liked_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_likes_id", "likes", ["id"])
+    op.create_index("ix_likes_session_id", "likes", ["session_id"])
+
+
+def downgrade():
+    op.drop_table("likes")
+    op.drop_table("votes")
+    op.drop_table("poll_options")
+    op.drop_table("polls")
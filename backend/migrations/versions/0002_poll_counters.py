@@ -0,0 +1,39 @@
+"""Denormalized total_votes/total_likes counters on polls
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant server default makes ADD COLUMN metadata-only on PostgreSQL 11+
+    with op.batch_alter_table("polls") as batch_op:
+        batch_op.add_column(sa.Column("total_votes", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("total_likes", sa.Integer(), nullable=False, server_default="0"))
+
+    op.execute("""
+        UPDATE polls SET
+            total_votes = (
+                SELECT COALESCE(SUM(vote_count), 0) FROM poll_options
+                WHERE poll_options.poll_id = polls.id
+            ),
+            total_likes = (
+                SELECT COUNT(*) FROM likes WHERE likes.poll_id = polls.id
+            )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table("polls") as batch_op:
+        batch_op.drop_column("total_likes")
+        batch_op.drop_column("total_votes")
@@ -0,0 +1,63 @@
+"""One vote and one like per (poll_id, session_id)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Before this constraint, the check-then-insert in the vote/like endpoints
+could let concurrent requests from one session through twice. Duplicates
+are removed (keeping the earliest row) and counters recomputed before the
+constraint is added.
+"""
+
+from alembic import op
+
+from migrations.online import create_index_online, is_postgresql
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+TABLES = {
+    "votes": "uq_votes_poll_session",
+    "likes": "uq_likes_poll_session",
+}
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(f"""
+            DELETE FROM {table} WHERE id NOT IN (
+                SELECT MIN(id) FROM {table} GROUP BY poll_id, session_id
+            )
+        """)
+
+    op.execute("""
+        UPDATE poll_options SET vote_count = (
+            SELECT COUNT(*) FROM votes WHERE votes.option_id = poll_options.id
+        )
+    """)
+    op.execute("""
+        UPDATE polls SET
+            total_votes = (SELECT COUNT(*) FROM votes WHERE votes.poll_id = polls.id),
+            total_likes = (SELECT COUNT(*) FROM likes WHERE likes.poll_id = polls.id)
+    """)
+
+    for table, name in TABLES.items():
+        if is_postgresql():
+            # Build the unique index without blocking writes, then attach it
+            # as the constraint (a brief catalog-only lock)
+            create_index_online(name, table, ["poll_id", "session_id"], unique=True)
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+        else:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.create_unique_constraint(name, ["poll_id", "session_id"])
+
+
+def downgrade():
+    for table, name in TABLES.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(name, type_="unique")
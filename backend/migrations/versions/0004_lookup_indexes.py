@@ -0,0 +1,34 @@
+"""Indexes for foreign-key lookups and keyset pagination
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+(poll_id, session_id) lookups on votes and likes are served by the unique
+constraints from 0003. Built CONCURRENTLY on PostgreSQL.
+"""
+
+from migrations.online import create_index_online, drop_index_online
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_poll_options_poll_id", "poll_options", ["poll_id"]),
+    ("ix_votes_option_id", "votes", ["option_id"]),
+    ("ix_polls_created_at_id", "polls", ["created_at", "id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_online(name, table)
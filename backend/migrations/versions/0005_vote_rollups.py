@@ -0,0 +1,52 @@
+"""Per-option vote counts in minute and hour buckets
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Backfilled from the existing votes in one INSERT ... SELECT per granularity.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.online import is_postgresql
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def bucket_expression(granularity):
+    if is_postgresql():
+        return f"date_trunc('{granularity}', voted_at)"
+    if granularity == "minute":
+        return "strftime('%Y-%m-%d %H:%M:00.000000', voted_at)"
+    return "strftime('%Y-%m-%d %H:00:00.000000', voted_at)"
+
+
+def upgrade():
+    op.create_table(
+        "vote_rollups",
+        sa.Column("poll_id", sa.Integer(), sa.ForeignKey("polls.id"), nullable=False),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("option_id", sa.Integer(), sa.ForeignKey("poll_options.id"), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("poll_id", "granularity", "bucket_start", "option_id"),
+    )
+
+    for granularity in ("minute", "hour"):
+        bucket = bucket_expression(granularity)
+        op.execute(f"""
+            INSERT INTO vote_rollups (poll_id, granularity, bucket_start, option_id, count)
+            SELECT poll_id, '{granularity}', {bucket}, option_id, COUNT(*)
+            FROM votes
+            WHERE voted_at IS NOT NULL
+            GROUP BY poll_id, {bucket}, option_id
+        """)
+
+
+def downgrade():
+    op.drop_table("vote_rollups")
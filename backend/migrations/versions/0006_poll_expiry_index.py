@@ -0,0 +1,25 @@
+"""Index for loading the polls the expiry scheduler has to close
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Serves WHERE is_active AND expires_at IS NOT NULL at startup and the
+deadline-bounded UPDATE that closes polls. Built CONCURRENTLY on PostgreSQL.
+"""
+
+from migrations.online import create_index_online, drop_index_online
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online("ix_polls_is_active_expires_at", "polls", ["is_active", "expires_at"])
+
+
+def downgrade():
+    drop_index_online("ix_polls_is_active_expires_at", "polls")
@@ -0,0 +1,38 @@
+"""Archive segments for the votes and likes of finished polls
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+Nothing is archived here; archive_polls.py moves rows over.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a default: metadata-only on PostgreSQL
+    with op.batch_alter_table("polls") as batch_op:
+        batch_op.add_column(sa.Column("archived_at", sa.DateTime(), nullable=True))
+    op.create_table(
+        "archive_segments",
+        sa.Column("poll_id", sa.Integer(), sa.ForeignKey("polls.id"), nullable=False),
+        sa.Column("kind", sa.String(8), nullable=False),
+        sa.Column("first_session_id", sa.String(100), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("poll_id", "kind", "first_session_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("archive_segments")
+    with op.batch_alter_table("polls") as batch_op:
+        batch_op.drop_column("archived_at")
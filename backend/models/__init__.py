@@ -2,5 +2,7 @@ from .poll import Poll
 from .poll_option import PollOption
 from .vote import Vote
 from .like import Like
+from .vote_rollup import VoteRollup
+from .archive_segment import ArchiveSegment
 
-__all__ = ["Poll", "PollOption", "Vote", "Like"]
+__all__ = ["Poll", "PollOption", "Vote", "Like", "VoteRollup", "ArchiveSegment"]
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, LargeBinary
+from database import Base
+
+
+class ArchiveSegment(Base):
+    """
+    A block of archived vote or like rows of a finished poll: up to
+    ARCHIVE_BLOCK_ROWS rows sorted by session id, zlib-compressed JSON.
+    first_session_id is the smallest session id in the block, so a lookup
+    reads exactly one segment.
+    """
+    __tablename__ = "archive_segments"
+    
+    poll_id = Column(Integer, ForeignKey("polls.id"), primary_key=True)
+    kind = Column(String(8), primary_key=True)  # "votes" or "likes"
+    first_session_id = Column(String(100), primary_key=True)
+    
+    row_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    
+    def __repr__(self):
+        return f"<ArchiveSegment(poll_id={self.poll_id}, kind={self.kind}, first_session_id='{self.first_session_id}', rows={self.row_count})>"
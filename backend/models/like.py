@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,6 +6,11 @@ from database import Base
 
 class Like(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        # One like per session per poll, enforced by the database. Also serves
+        # as the (poll_id, session_id) lookup index for the like endpoints.
+        UniqueConstraint("poll_id", "session_id", name="uq_likes_poll_session"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     poll_id = Column(Integer, ForeignKey("polls.id"), nullable=False)
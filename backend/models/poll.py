@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,6 +6,12 @@ from database import Base
 
 class Poll(Base):
     __tablename__ = "polls"
+    __table_args__ = (
+        # Supports keyset pagination ordered by (created_at, id)
+        Index("ix_polls_created_at_id", "created_at", "id"),
+        # Lets the expiry scheduler find open polls with a deadline
+        Index("ix_polls_is_active_expires_at", "is_active", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -17,6 +23,11 @@ class Poll(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     expires_at = Column(DateTime, nullable=True)  # Poll expiry time
     is_active = Column(Boolean, default=True)  # Can manually close poll
+    archived_at = Column(DateTime, nullable=True)  # Votes and likes moved to archive_segments
+    
+    # Denormalized counters, updated atomically by the vote/like endpoints
+    total_votes = Column(Integer, nullable=False, default=0, server_default="0")
+    total_likes = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     options = relationship("PollOption", back_populates="poll", cascade="all, delete-orphan")
@@ -7,7 +7,7 @@ class PollOption(Base):
     __tablename__ = "poll_options"
     
     id = Column(Integer, primary_key=True, index=True)
-    poll_id = Column(Integer, ForeignKey("polls.id"), nullable=False)
+    poll_id = Column(Integer, ForeignKey("polls.id"), nullable=False, index=True)
     option_text = Column(String(200), nullable=False)
     vote_count = Column(Integer, default=0)
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -6,10 +6,15 @@ from database import Base
 
 class Vote(Base):
     __tablename__ = "votes"
+    __table_args__ = (
+        # One vote per session per poll, enforced by the database. Also serves
+        # as the (poll_id, session_id) lookup index for the vote endpoints.
+        UniqueConstraint("poll_id", "session_id", name="uq_votes_poll_session"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     poll_id = Column(Integer, ForeignKey("polls.id"), nullable=False)
-    option_id = Column(Integer, ForeignKey("poll_options.id"), nullable=False)
+    option_id = Column(Integer, ForeignKey("poll_options.id"), nullable=False, index=True)
     session_id = Column(String(100), nullable=False, index=True)
     
     voted_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from database import Base
+
+
+class VoteRollup(Base):
+    """
+    Votes per option per time bucket, kept up to date by every write path
+    so timelines never have to scan the votes table.
+    """
+    __tablename__ = "vote_rollups"
+    
+    # Primary key order serves "one poll, one granularity, a time range"
+    poll_id = Column(Integer, ForeignKey("polls.id"), primary_key=True)
+    granularity = Column(String(8), primary_key=True)  # "minute" or "hour"
+    bucket_start = Column(DateTime, primary_key=True)
+    option_id = Column(Integer, ForeignKey("poll_options.id"), primary_key=True)
+    
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<VoteRollup(poll_id={self.poll_id}, {self.granularity}={self.bucket_start}, option_id={self.option_id}, count={self.count})>"
@@ -0,0 +1,98 @@
+"""
+Counter repair script.
+Run this whenever the denormalized vote and like counters may have drifted
+from the underlying rows. The columns themselves are created by migrations
+(see init_db.py).
+"""
+
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from database import engine
+
+
+def recompute_counters(
+    connection: Connection,
+    first_poll_id: Optional[int] = None,
+    last_poll_id: Optional[int] = None,
+    include_archived: bool = False
+):
+    """
+    Recompute option vote counts and poll totals from the vote and like rows,
+    optionally only for polls with ids in [first_poll_id, last_poll_id].
+    Archived polls no longer have those rows and are skipped unless
+    include_archived is set.
+    """
+    poll_range = {"first": first_poll_id, "last": last_poll_id, "archived": include_archived}
+    in_range = "(:first IS NULL OR {0} >= :first) AND (:last IS NULL OR {0} <= :last)"
+    connection.execute(text(f"""
+        UPDATE poll_options SET vote_count = (
+            SELECT COUNT(*) FROM votes WHERE votes.option_id = poll_options.id
+        )
+        WHERE {in_range.format("poll_options.poll_id")}
+          AND (:archived OR poll_options.poll_id IN (SELECT id FROM polls WHERE archived_at IS NULL))
+    """), poll_range)
+    connection.execute(text(f"""
+        UPDATE polls SET
+            total_votes = (
+                SELECT COALESCE(SUM(vote_count), 0) FROM poll_options
+                WHERE poll_options.poll_id = polls.id
+            ),
+            total_likes = (
+                SELECT COUNT(*) FROM likes WHERE likes.poll_id = polls.id
+            )
+        WHERE {in_range.format("polls.id")} AND (:archived OR polls.archived_at IS NULL)
+    """), poll_range)
+
+
+def rebuild_rollups(connection: Connection, first_poll_id: Optional[int] = None, last_poll_id: Optional[int] = None):
+    """
+    Rebuild the minute/hour vote rollups from the vote rows, optionally for a
+    poll-id range. Archived polls keep the rollups they have.
+    """
+    poll_range = {"first": first_poll_id, "last": last_poll_id}
+    in_range = (
+        "(:first IS NULL OR poll_id >= :first) AND (:last IS NULL OR poll_id <= :last)"
+        " AND poll_id IN (SELECT id FROM polls WHERE archived_at IS NULL)"
+    )
+    connection.execute(text(f"DELETE FROM vote_rollups WHERE {in_range}"), poll_range)
+    for granularity, sqlite_format in (("minute", "%Y-%m-%d %H:%M:00.000000"), ("hour", "%Y-%m-%d %H:00:00.000000")):
+        if connection.dialect.name == "postgresql":
+            bucket = f"date_trunc('{granularity}', voted_at)"
+        else:
+            bucket = f"strftime('{sqlite_format}', voted_at)"
+        connection.execute(text(f"""
+            INSERT INTO vote_rollups (poll_id, granularity, bucket_start, option_id, count)
+            SELECT poll_id, '{granularity}', {bucket}, option_id, COUNT(*)
+            FROM votes
+            WHERE voted_at IS NOT NULL AND {in_range}
+            GROUP BY poll_id, {bucket}, option_id
+        """), poll_range)
+
+
+def stray_archived_rows(connection: Connection) -> Dict[str, int]:
+    """Vote and like rows left in the hot tables of polls already archived"""
+    return {
+        table: connection.execute(text(f"""
+            SELECT COUNT(*) FROM {table}
+            WHERE poll_id IN (SELECT id FROM polls WHERE archived_at IS NOT NULL)
+        """)).scalar()
+        for table in ("votes", "likes")
+    }
+
+
+def repair_counters():
+    """Recompute option vote counts, poll totals and vote rollups for every poll."""
+    print("Repairing vote and like counters...")
+    with engine.begin() as connection:
+        stray = stray_archived_rows(connection)
+        if any(stray.values()):
+            # The archive is authoritative for these polls; don't mix the two
+            print(f"Skipping {stray['votes']} votes and {stray['likes']} likes on archived polls")
+        recompute_counters(connection)
+        rebuild_rollups(connection)
+    print("Counters repaired successfully!")
+
+
+if __name__ == "__main__":
+    repair_counters()
@@ -2,5 +2,6 @@ from .polls import router as polls_router
 from .votes import router as votes_router
 from .likes import router as likes_router
 from .websocket import router as websocket_router
+from .admin import router as admin_router
 
-__all__ = ["polls_router", "votes_router", "likes_router", "websocket_router"]
+__all__ = ["polls_router", "votes_router", "likes_router", "websocket_router", "admin_router"]
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional
+from config import settings
+from bulk_import import import_stream, DEFAULT_CHUNK_SIZE
+from routers.polls import poll_count_cache
+from services.expiry import expiry_scheduler
+from services.poll_cache import poll_cache
+from websocket.connection_manager import manager
+import hmac
+import io
+import tempfile
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def require_admin(token: Optional[str]):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not token or not hmac.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post("/import")
+async def bulk_import(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: str = "ndjson",
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1),
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Bulk import polls, options, votes and likes from an NDJSON or CSV request
+    body (see bulk_import.py for the record format). The body is spooled to
+    disk as it arrives, so memory use doesn't depend on its size.
+    """
+    require_admin(x_admin_token)
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        
+        # The import is synchronous (COPY / executemany); keep it off the event loop
+        stream = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        try:
+            importer = await run_in_threadpool(import_stream, stream, format, chunk_size)
+        except (ValueError, KeyError, SQLAlchemyError) as e:
+            # Report the driver's message rather than the full SQL statement
+            reason = getattr(e, "orig", None) or e
+            raise HTTPException(status_code=400, detail=f"Import failed, nothing was imported: {reason}")
+
+    poll_count_cache.invalidate()
+    if importer.first_poll_id is not None:
+        # Counters were recomputed and new deadlines added for the imported
+        # id range; catch up here and on every other worker
+        first, last = importer.first_poll_id, importer.last_poll_id
+        await poll_cache.invalidate_range(first, last)
+        await expiry_scheduler.load(first, last)
+        background_tasks.add_task(manager.publish_polls_imported, first, last)
+    return {"imported": importer.counts}
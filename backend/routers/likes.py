@@ -1,26 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, BackgroundTasks, Cookie
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, literal
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from database import get_db
+from datetime import datetime
+from utils.rate_limit import limiter, ip_key, session_key
+from database import get_db, dialect_insert
 from models import Poll, Like
 from schemas import LikeResponse, LikeDeleteResponse
+from services.poll_cache import poll_cache
+from services.archive import find_archived
+from services.membership import liked, removal_event
 from websocket.connection_manager import manager
 import uuid
 
 router = APIRouter(prefix="/api/polls", tags=["likes"])
-limiter = Limiter(key_func=get_remote_address)
 
 
 @router.post("/{poll_id}/like", response_model=LikeResponse, status_code=201)
-@limiter.limit("20/minute")  # Limit likes to prevent spam
+@limiter.limit("20/minute", key_func=ip_key)  # Session cookies are free, so cap per IP too
+@limiter.limit("20/minute", key_func=session_key)  # Limit likes to prevent spam
 async def like_poll(
     request: Request,
     poll_id: int,
     background_tasks: BackgroundTasks,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Like a poll using session-based tracking"""
@@ -29,34 +33,53 @@ async def like_poll(
         session_id = str(uuid.uuid4())
         response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=31536000)  # 1 year
     
-    # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
-        raise HTTPException(status_code=404, detail="Poll not found")
-    
-    # Check if session already liked
-    existing_like = db.query(Like).filter(
-        Like.poll_id == poll_id,
-        Like.session_id == session_id
-    ).first()
+    # Definite duplicates are rejected without a database round trip
+    if liked.contains(poll_id, session_id):
+        raise HTTPException(
+            status_code=400,
+            detail="You have already liked this poll"
+        )
     
-    if existing_like:
+    # Insert the like only if the poll exists and isn't archived. The unique
+    # constraint on (poll_id, session_id) rejects duplicates atomically.
+    liked_at = datetime.utcnow()
+    poll_match = select(
+        Poll.id,
+        literal(session_id),
+        literal(liked_at)
+    ).where(Poll.id == poll_id, Poll.archived_at.is_(None))
+    insert_like = (
+        dialect_insert(Like)
+        .from_select(["poll_id", "session_id", "liked_at"], poll_match)
+        .on_conflict_do_nothing(index_elements=["poll_id", "session_id"])
+        .returning(Like.id)
+    )
+    like_id = await db.scalar(insert_like)
+    
+    if like_id is None:
+        await db.rollback()
+        poll = (await db.execute(select(Poll.archived_at).where(Poll.id == poll_id))).first()
+        if not poll:
+            raise HTTPException(status_code=404, detail="Poll not found")
+        if poll.archived_at:
+            raise HTTPException(status_code=400, detail="This poll is archived")
+        liked.add(poll_id, session_id)
         raise HTTPException(
             status_code=400,
             detail="You have already liked this poll"
         )
     
-    # Create like with session ID
-    new_like = Like(
-        poll_id=poll_id,
-        session_id=session_id
+    # Increment the poll-level counter in the same transaction
+    total_likes = await db.scalar(
+        update(Poll)
+        .where(Poll.id == poll_id)
+        .values(total_likes=Poll.total_likes + 1)
+        .returning(Poll.total_likes)
     )
-    db.add(new_like)
-    db.commit()
-    db.refresh(new_like)
     
-    # Calculate total likes for the poll
-    total_likes = len(poll.likes)
+    await db.commit()
+    liked.add(poll_id, session_id)
+    await poll_cache.patch_likes(poll_id, total_likes)
     
     # Broadcast like update to all connected clients
     background_tasks.add_task(
@@ -67,9 +90,9 @@ async def like_poll(
     )
     
     return LikeResponse(
-        id=new_like.id,
-        poll_id=new_like.poll_id,
-        liked_at=new_like.liked_at,
+        id=like_id,
+        poll_id=poll_id,
+        liked_at=liked_at,
         message="Poll liked successfully"
     )
 
@@ -78,14 +101,16 @@ async def like_poll(
 async def unlike_poll(
     poll_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Remove like from a poll using session-based tracking"""
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = (await db.execute(select(Poll.archived_at).where(Poll.id == poll_id))).first()
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
+    if poll.archived_at:
+        raise HTTPException(status_code=400, detail="This poll is archived")
     
     if not session_id:
         raise HTTPException(
@@ -93,24 +118,35 @@ async def unlike_poll(
             detail="Like not found"
         )
     
-    # Find existing like
-    existing_like = db.query(Like).filter(
-        Like.poll_id == poll_id,
-        Like.session_id == session_id
-    ).first()
+    # Delete the like; only the request that actually removed a row
+    # decrements the counter
+    deleted_id = await db.scalar(
+        delete(Like)
+        .where(Like.poll_id == poll_id, Like.session_id == session_id)
+        .returning(Like.id)
+    )
     
-    if not existing_like:
+    if deleted_id is None:
+        await db.rollback()
+        liked.discard(poll_id, session_id)
         raise HTTPException(
             status_code=404,
             detail="Like not found"
         )
     
-    # Delete like
-    db.delete(existing_like)
-    db.commit()
+    total_likes = await db.scalar(
+        update(Poll)
+        .where(Poll.id == poll_id)
+        .values(total_likes=Poll.total_likes - 1)
+        .returning(Poll.total_likes)
+    )
+    await db.commit()
+    await poll_cache.patch_likes(poll_id, total_likes)
     
-    # Calculate total likes for the poll (after deletion)
-    total_likes = len(poll.likes)
+    # The session may like the poll again: forget it here and on every
+    # other worker
+    removed = liked.discard(poll_id, session_id)
+    background_tasks.add_task(manager.publish, removal_event("likes", poll_id, removed))
     
     # Broadcast unlike update to all connected clients
     background_tasks.add_task(
@@ -127,25 +163,35 @@ async def unlike_poll(
 
 
 @router.get("/{poll_id}/like")
-def get_user_like_status(
+async def get_user_like_status(
     poll_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Check if session has liked the poll"""
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = (await db.execute(select(Poll.archived_at).where(Poll.id == poll_id))).first()
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
     if not session_id:
         return {"liked": False}
     
+    # Finished polls keep their likes in the archive
+    if poll.archived_at:
+        archived = await find_archived(db, poll_id, "likes", session_id)
+        if not archived:
+            return {"liked": False}
+        return {
+            "liked": True,
+            "liked_at": datetime.fromisoformat(archived[1]) if archived[1] else None
+        }
+    
     # Check if session liked
-    like = db.query(Like).filter(
+    like = await db.scalar(select(Like).where(
         Like.poll_id == poll_id,
         Like.session_id == session_id
-    ).first()
+    ))
     
     if not like:
         return {"liked": False}
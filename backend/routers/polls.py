@@ -1,17 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, BackgroundTasks, Cookie
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional
 from datetime import datetime, timedelta
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from database import get_db
-from models import Poll, PollOption, Vote, Like
-from schemas import PollCreate, PollUpdate, PollResponse, PollDetail, PollListResponse
+from models import Poll, PollOption, Vote, Like, VoteRollup, ArchiveSegment
+from schemas import (
+    PollCreate, PollUpdate, PollResponse, PollDetail, PollListResponse, PollTimeline, TimelinePoint,
+    PollSessionState, SessionStateResponse
+)
 from websocket.connection_manager import manager
+from config import settings
+from services.poll_cache import poll_cache, poll_snapshot, load_poll_snapshot, is_expired
+from services.rollups import BUCKETS, choose_bucket, load_timeline, naive_utc
+from services.export import FORMATS, export_votes
+from services.expiry import expiry_scheduler
+from services import membership
+from services.session_state import load_session_state
+from utils.rate_limit import limiter
+from utils.pagination import CachedCount, encode_cursor, decode_cursor
+from utils.http_cache import make_etag, etag_matches, cache_headers, not_modified, latest
 import uuid
 
 router = APIRouter(prefix="/api/polls", tags=["polls"])
-limiter = Limiter(key_func=get_remote_address)
+
+# Total poll count shared by list requests, refreshed at most every TTL seconds
+poll_count_cache = CachedCount(ttl_seconds=settings.POLL_COUNT_CACHE_TTL_SECONDS)
 
 
 @router.post("/", response_model=PollDetail, status_code=201)
@@ -21,7 +37,7 @@ async def create_poll(
     poll_data: PollCreate,
     response: Response,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Create a new poll with options"""
@@ -44,18 +60,18 @@ async def create_poll(
         expires_at=expires_at
     )
     db.add(new_poll)
-    db.flush()  # Get poll ID without committing
+    await db.flush()  # Get poll ID without committing
     
     # Create poll options
-    for option_text in poll_data.options:
-        poll_option = PollOption(
-            poll_id=new_poll.id,
-            option_text=option_text
-        )
-        db.add(poll_option)
+    poll_options = [
+        PollOption(poll_id=new_poll.id, option_text=option_text)
+        for option_text in poll_data.options
+    ]
+    db.add_all(poll_options)
     
-    db.commit()
-    db.refresh(new_poll)
+    await db.commit()
+    poll_count_cache.invalidate()
+    expiry_scheduler.schedule(new_poll.id, expires_at)
     
     # Build response
     poll_response = PollDetail(
@@ -68,7 +84,7 @@ async def create_poll(
         is_active=new_poll.is_active,
         options=[
             {"id": opt.id, "option_text": opt.option_text, "vote_count": 0}
-            for opt in new_poll.options
+            for opt in poll_options
         ],
         total_votes=0,
         total_likes=0,
@@ -81,7 +97,7 @@ async def create_poll(
     # Broadcast new poll to all connected clients
     background_tasks.add_task(
         manager.broadcast_poll_created,
-        poll_response.model_dump()
+        poll_response.model_dump(mode="json")
     )
     
     return poll_response
@@ -89,112 +105,277 @@ async def create_poll(
 
 @router.get("/", response_model=PollListResponse)
 @limiter.limit("30/minute")  # More lenient for viewing polls
-def list_polls(
+async def list_polls(
     request: Request,
+    response: Response,
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    session_id: Optional[str] = Cookie(default=None)
 ):
-    """Get list of all polls with pagination"""
+    """
+    Get list of all polls, newest first.
+    Supports offset pagination (page/page_size) and keyset pagination: pass
+    the next_cursor of a previous response as cursor to fetch the next page
+    without scanning the skipped rows.
+    Answers If-None-Match with 304 when the page is unchanged.
+    """
     if page < 1:
         page = 1
     if page_size < 1 or page_size > 100:
         page_size = 10
     
-    skip = (page - 1) * page_size
+    # Get total count (cached, may lag behind by a few seconds)
+    total = await poll_count_cache.get(
+        lambda: db.scalar(select(func.count()).select_from(Poll))
+    )
+    
+    query = select(Poll).order_by(Poll.created_at.desc(), Poll.id.desc())
+    
+    if cursor:
+        # Keyset pagination: continue after the last poll of the previous page
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Poll.created_at, Poll.id) < (cursor_created_at, cursor_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    # Get polls for this page, then the session's votes and likes on all
+    # of them in one query
+    polls = (await db.scalars(query.limit(page_size))).all()
+    states = await load_session_state(db, session_id, [poll.id for poll in polls]) if session_id else {}
     
-    # Get total count
-    total = db.query(Poll).count()
+    def user_state(poll_id: int) -> tuple:
+        state = states.get(poll_id)
+        return (state["voted"], state["liked"]) if state else (False, False)
     
-    # Get polls with pagination
-    polls = db.query(Poll).order_by(Poll.created_at.desc()).offset(skip).limit(page_size).all()
+    # Feed version: the page's polls with their counters and the session's
+    # state, plus the total
+    etag = make_etag(total, *(
+        (poll.id, poll.updated_at, poll.total_votes, poll.total_likes, user_state(poll.id))
+        for poll in polls
+    ))
+    headers = cache_headers(etag, latest(poll.updated_at for poll in polls))
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    response.headers.update(headers)
     
     # Build response
     poll_responses = []
     for poll in polls:
-        total_votes = sum(opt.vote_count for opt in poll.options)
-        total_likes = len(poll.likes)
-        
+        user_voted, user_liked = user_state(poll.id)
         poll_responses.append(PollResponse(
             id=poll.id,
             title=poll.title,
             description=poll.description,
             created_by=poll.created_by,
             created_at=poll.created_at,
-            total_votes=total_votes,
-            total_likes=total_likes
+            total_votes=poll.total_votes,
+            total_likes=poll.total_likes,
+            user_voted=user_voted,
+            user_liked=user_liked
         ))
     
+    next_cursor = None
+    if len(polls) == page_size:
+        next_cursor = encode_cursor(polls[-1].created_at, polls[-1].id)
+    
     return PollListResponse(
         polls=poll_responses,
         total=total,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=next_cursor
     )
 
 
+@router.get("/me/state", response_model=SessionStateResponse)
+@limiter.limit("60/minute")
+async def get_session_state(
+    request: Request,
+    ids: str,
+    db: AsyncSession = Depends(get_db),
+    session_id: Optional[str] = Cookie(default=None)
+):
+    """
+    Whether the current session voted on / liked each of the given polls
+    (?ids=1,2,3, at most 100), in one query instead of two requests per poll.
+    """
+    try:
+        poll_ids = list(dict.fromkeys(int(poll_id) for poll_id in ids.split(",") if poll_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of poll ids")
+    if not poll_ids or len(poll_ids) > 100:
+        raise HTTPException(status_code=400, detail="Pass between 1 and 100 poll ids")
+    
+    states = await load_session_state(db, session_id, poll_ids)
+    return SessionStateResponse(states=[
+        PollSessionState(**states[poll_id]) for poll_id in poll_ids if poll_id in states
+    ])
+
+
 @router.get("/{poll_id}", response_model=PollDetail)
 @limiter.limit("30/minute")  # More lenient for viewing individual polls
-def get_poll(
+async def get_poll(
     request: Request,
     poll_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
-    """Get detailed poll information including options"""
-    # Get poll
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
+    """
+    Get detailed poll information including options.
+    Answers If-None-Match with 304 when neither the poll nor the caller's
+    view of it changed.
+    """
+    # Shared snapshot, loaded once for concurrent requests and then cached
+    snapshot = await poll_cache.get(poll_id, lambda: load_poll_snapshot(db, poll_id))
+    if snapshot is None:
         raise HTTPException(status_code=404, detail="Poll not found")
     
-    # Calculate totals
-    total_votes = sum(opt.vote_count for opt in poll.options)
-    total_likes = len(poll.likes)
-    
-    # Check ownership
-    is_owner = session_id and poll.owner_session_id == session_id
+    # The session's vote and like, in one query
+    state = (await load_session_state(db, session_id, [poll_id])).get(poll_id) if session_id else None
     
-    # Check if expired
-    is_expired = poll.expires_at and datetime.utcnow() > poll.expires_at
+    is_owner = bool(session_id) and snapshot["owner_session_id"] == session_id
+    etag = make_etag(
+        snapshot["id"],
+        snapshot["updated_at"],
+        snapshot["total_votes"],
+        snapshot["total_likes"],
+        is_owner,
+        is_expired(snapshot),
+        bool(state and state["voted"]),
+        bool(state and state["liked"])
+    )
+    headers = cache_headers(etag, datetime.fromisoformat(snapshot["updated_at"]))
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    response.headers.update(headers)
     
-    # Build response
+    return poll_detail(snapshot, session_id, state)
+
+
+def poll_detail(snapshot: dict, session_id: Optional[str], state: Optional[dict] = None) -> PollDetail:
+    """Layer the per-session fields on top of a cached poll snapshot"""
     return PollDetail(
-        id=poll.id,
-        title=poll.title,
-        description=poll.description,
-        created_by=poll.created_by,
-        created_at=poll.created_at,
-        expires_at=poll.expires_at,
-        is_active=poll.is_active,
-        options=[
-            {
-                "id": opt.id,
-                "option_text": opt.option_text,
-                "vote_count": opt.vote_count
-            }
-            for opt in poll.options
-        ],
-        total_votes=total_votes,
-        total_likes=total_likes,
-        user_voted=False,
-        user_liked=False,
-        is_owner=is_owner,
-        is_expired=is_expired
+        id=snapshot["id"],
+        title=snapshot["title"],
+        description=snapshot["description"],
+        created_by=snapshot["created_by"],
+        created_at=snapshot["created_at"],
+        expires_at=snapshot["expires_at"],
+        is_active=snapshot["is_active"],
+        options=snapshot["options"],
+        total_votes=snapshot["total_votes"],
+        total_likes=snapshot["total_likes"],
+        user_voted=bool(state and state["voted"]),
+        user_liked=bool(state and state["liked"]),
+        is_owner=bool(session_id) and snapshot["owner_session_id"] == session_id,
+        is_expired=is_expired(snapshot)
+    )
+
+
+@router.get("/{poll_id}/timeline", response_model=PollTimeline)
+@limiter.limit("30/minute")
+async def get_poll_timeline(
+    request: Request,
+    poll_id: int,
+    bucket: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = 200,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Votes per option over time, read from the vote rollups.
+    bucket is one of 1m, 5m, 15m, 1h, 6h, 1d; it is coarsened (or picked, if
+    omitted) so that [start, end) fits in max_points buckets. start defaults
+    to the poll's creation (and is never earlier) and end to now (UTC). A
+    range too long for max_points even in 1d buckets is rejected.
+    """
+    if bucket is not None and bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    max_points = min(max(max_points, 1), 1000)
+    
+    snapshot = await poll_cache.get(poll_id, lambda: load_poll_snapshot(db, poll_id))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    
+    # Timestamps are stored as naive UTC; ?start=...Z arrives timezone-aware
+    created_at = datetime.fromisoformat(snapshot["created_at"])
+    start = max(naive_utc(start), created_at) if start else created_at
+    end = naive_utc(end) if end else datetime.utcnow()
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    bucket = choose_bucket(start, end, bucket, max_points)
+    if bucket is None:
+        raise HTTPException(status_code=400, detail=f"Range too long for {max_points} points, even in 1d buckets")
+    option_ids = [option["id"] for option in snapshot["options"]]
+    series = await load_timeline(db, poll_id, option_ids, start, end, bucket)
+    
+    return PollTimeline(
+        poll_id=poll_id,
+        bucket=bucket,
+        start=start,
+        end=end,
+        option_ids=option_ids,
+        points=[
+            TimelinePoint(start=bucket_start, counts=counts, total=sum(counts))
+            for bucket_start, counts in series
+        ]
+    )
+
+
+@router.get("/{poll_id}/export")
+@limiter.limit("5/minute")
+async def export_poll_votes(
+    request: Request,
+    poll_id: int,
+    format: str = "csv",
+    db: AsyncSession = Depends(get_db),
+    session_id: Optional[str] = Cookie(default=None)
+):
+    """
+    Stream the poll's raw votes (option, voted_at, hashed voter) as CSV or
+    NDJSON. Only the owner can export.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    
+    snapshot = await poll_cache.get(poll_id, lambda: load_poll_snapshot(db, poll_id))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    if not session_id or snapshot["owner_session_id"] != session_id:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to export this poll"
+        )
+    
+    option_texts = {option["id"]: option["option_text"] for option in snapshot["options"]}
+    return StreamingResponse(
+        export_votes(poll_id, option_texts, format),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="poll-{poll_id}-votes.{format}"'}
     )
 
 
 @router.put("/{poll_id}", response_model=PollDetail)
 @limiter.limit("10/minute")
-def update_poll(
+async def update_poll(
     request: Request,
     poll_id: int,
     poll_update: PollUpdate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Update poll (title, description, or close it). Only owner can update."""
-    # Get poll
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    # Get poll with its options
+    poll = await db.get(Poll, poll_id, options=[selectinload(Poll.options)])
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
@@ -210,54 +391,43 @@ def update_poll(
         poll.title = poll_update.title
     if poll_update.description is not None:
         poll.description = poll_update.description
+    if poll_update.is_active and not poll.is_active and poll.archived_at:
+        raise HTTPException(status_code=400, detail="Archived polls can't be reopened")
+    
+    closing = poll.is_active and poll_update.is_active is False
     if poll_update.is_active is not None:
         poll.is_active = poll_update.is_active
     
     poll.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(poll)
+    await db.commit()
+    expiry_scheduler.schedule(poll_id, poll.expires_at if poll.is_active else None)
     
-    # Calculate totals
-    total_votes = sum(opt.vote_count for opt in poll.options)
-    total_likes = len(poll.likes)
-    is_expired = poll.expires_at and datetime.utcnow() > poll.expires_at
+    # Drop cached snapshots here and on every other worker; poll_closed
+    # also tells the poll's subscribers
+    await poll_cache.invalidate(poll_id)
+    if closing:
+        background_tasks.add_task(manager.broadcast_poll_closed, poll_id, poll.updated_at)
+    else:
+        background_tasks.add_task(manager.publish_poll_invalidated, poll_id)
     
-    return PollDetail(
-        id=poll.id,
-        title=poll.title,
-        description=poll.description,
-        created_by=poll.created_by,
-        created_at=poll.created_at,
-        expires_at=poll.expires_at,
-        is_active=poll.is_active,
-        options=[
-            {
-                "id": opt.id,
-                "option_text": opt.option_text,
-                "vote_count": opt.vote_count
-            }
-            for opt in poll.options
-        ],
-        total_votes=total_votes,
-        total_likes=total_likes,
-        user_voted=False,
-        user_liked=False,
-        is_owner=True,
-        is_expired=is_expired
-    )
+    state = (await load_session_state(db, session_id, [poll_id])).get(poll_id)
+    return poll_detail(poll_snapshot(poll), session_id, state)
 
 
 @router.delete("/{poll_id}", status_code=204)
 @limiter.limit("5/minute")
-def delete_poll(
+async def delete_poll(
     request: Request,
     poll_id: int,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Delete a poll. Only owner can delete."""
     # Get poll
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = (await db.execute(
+        select(Poll.id, Poll.owner_session_id).where(Poll.id == poll_id)
+    )).first()
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
@@ -268,8 +438,20 @@ def delete_poll(
             detail="You don't have permission to delete this poll"
         )
     
-    # Delete poll (cascade will delete options, votes, likes)
-    db.delete(poll)
-    db.commit()
+    # Delete poll with its votes, likes (live and archived), rollups and options in bulk rather than
+    # loading every child row for an ORM cascade
+    await db.execute(delete(VoteRollup).where(VoteRollup.poll_id == poll_id))
+    await db.execute(delete(ArchiveSegment).where(ArchiveSegment.poll_id == poll_id))
+    await db.execute(delete(Vote).where(Vote.poll_id == poll_id))
+    await db.execute(delete(Like).where(Like.poll_id == poll_id))
+    await db.execute(delete(PollOption).where(PollOption.poll_id == poll_id))
+    await db.execute(delete(Poll).where(Poll.id == poll_id))
+    await db.commit()
+    poll_count_cache.invalidate()
+    expiry_scheduler.cancel(poll_id)
+    membership.voted.drop(poll_id)
+    membership.liked.drop(poll_id)
+    await poll_cache.invalidate(poll_id)
+    background_tasks.add_task(manager.publish_poll_invalidated, poll_id, deleted=True)
     
     return Response(status_code=204)
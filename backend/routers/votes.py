@@ -1,27 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, BackgroundTasks, Cookie
-from sqlalchemy.orm import Session
-from typing import Optional
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from database import get_db
+from sqlalchemy import select, update, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
+from datetime import datetime
+from utils.rate_limit import limiter, ip_key, session_key
+from database import get_db, dialect_insert
 from models import Poll, PollOption, Vote
-from schemas import VoteCreate, VoteResponse
+from schemas import VoteCreate, VoteResponse, PendingVoteResponse
+from config import settings
+from services.poll_cache import poll_cache, load_poll_snapshot, is_expired
+from services.vote_buffer import vote_buffer, PendingVote
+from services.rollups import rollup_increments, increment_statement
+from services.archive import find_archived
+from services.membership import voted
 from websocket.connection_manager import manager
 import uuid
 
 router = APIRouter(prefix="/api/polls", tags=["votes"])
-limiter = Limiter(key_func=get_remote_address)
 
 
-@router.post("/{poll_id}/vote", response_model=VoteResponse, status_code=201)
-@limiter.limit("10/minute")  # Limit votes to prevent manipulation
+@router.post(
+    "/{poll_id}/vote",
+    response_model=Union[VoteResponse, PendingVoteResponse],
+    status_code=201,
+    responses={202: {"model": PendingVoteResponse, "description": "Vote buffered (VOTE_BUFFER_ENABLED)"}}
+)
+@limiter.limit("10/minute", key_func=ip_key)  # Session cookies are free, so cap per IP too
+@limiter.limit("10/minute", key_func=session_key)  # Limit votes to prevent manipulation
 async def submit_vote(
     request: Request,
     poll_id: int,
     vote_data: VoteCreate,
     background_tasks: BackgroundTasks,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Submit a vote for a poll option using session-based tracking"""
@@ -30,89 +42,181 @@ async def submit_vote(
         session_id = str(uuid.uuid4())
         response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=31536000)  # 1 year
     
-    # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
-    if not poll:
-        raise HTTPException(status_code=404, detail="Poll not found")
-    
-    # Check if option exists and belongs to this poll
-    option = db.query(PollOption).filter(
-        PollOption.id == vote_data.option_id,
-        PollOption.poll_id == poll_id
-    ).first()
-    if not option:
+    # Definite duplicates are rejected without a database round trip
+    if voted.contains(poll_id, session_id):
         raise HTTPException(
-            status_code=404,
-            detail="Poll option not found or does not belong to this poll"
+            status_code=400,
+            detail="You have already voted on this poll"
         )
     
-    # Check if session already voted
-    existing_vote = db.query(Vote).filter(
-        Vote.poll_id == poll_id,
-        Vote.session_id == session_id
-    ).first()
+    if settings.VOTE_BUFFER_ENABLED:
+        return await buffer_vote(poll_id, vote_data.option_id, session_id, response, db)
+    
+    # Insert the vote only if the option belongs to this poll and the poll
+    # is open. The unique constraint on (poll_id, session_id) rejects
+    # duplicates atomically.
+    voted_at = datetime.utcnow()
+    option_match = select(
+        PollOption.poll_id,
+        PollOption.id,
+        literal(session_id),
+        literal(voted_at)
+    ).join(Poll, Poll.id == PollOption.poll_id).where(
+        PollOption.id == vote_data.option_id,
+        PollOption.poll_id == poll_id,
+        Poll.is_active == True,
+        or_(Poll.expires_at.is_(None), Poll.expires_at > voted_at)
+    )
+    insert_vote = (
+        dialect_insert(Vote)
+        .from_select(["poll_id", "option_id", "session_id", "voted_at"], option_match)
+        .on_conflict_do_nothing(index_elements=["poll_id", "session_id"])
+        .returning(Vote.id)
+    )
+    vote_id = await db.scalar(insert_vote)
     
-    if existing_vote:
+    if vote_id is None:
+        await db.rollback()
+        # Nothing was inserted: work out why
+        poll = (await db.execute(
+            select(Poll.is_active, Poll.expires_at).where(Poll.id == poll_id)
+        )).first()
+        if not poll:
+            raise HTTPException(status_code=404, detail="Poll not found")
+        if not await db.scalar(select(PollOption.id).where(
+            PollOption.id == vote_data.option_id,
+            PollOption.poll_id == poll_id
+        )):
+            raise HTTPException(
+                status_code=404,
+                detail="Poll option not found or does not belong to this poll"
+            )
+        if not poll.is_active or (poll.expires_at and poll.expires_at <= voted_at):
+            raise HTTPException(status_code=400, detail="This poll is closed")
+        voted.add(poll_id, session_id)
         raise HTTPException(
             status_code=400,
             detail="You have already voted on this poll"
         )
     
-    # Create vote with session ID
-    new_vote = Vote(
-        poll_id=poll_id,
-        option_id=vote_data.option_id,
-        session_id=session_id
+    # Increment the option and poll counters and the timeline rollups in the
+    # same transaction
+    vote_count = await db.scalar(
+        update(PollOption)
+        .where(PollOption.id == vote_data.option_id)
+        .values(vote_count=PollOption.vote_count + 1)
+        .returning(PollOption.vote_count)
     )
-    db.add(new_vote)
-    
-    # Increment vote count for the option
-    option.vote_count += 1
-    
-    db.commit()
-    db.refresh(new_vote)
+    total_votes = await db.scalar(
+        update(Poll)
+        .where(Poll.id == poll_id)
+        .values(total_votes=Poll.total_votes + 1)
+        .returning(Poll.total_votes)
+    )
+    await db.execute(increment_statement(
+        rollup_increments([(poll_id, vote_data.option_id, voted_at)])
+    ))
     
-    # Calculate total votes for the poll
-    total_votes = sum(opt.vote_count for opt in poll.options)
+    await db.commit()
+    voted.add(poll_id, session_id)
+    await poll_cache.patch_votes(poll_id, vote_data.option_id, vote_count, total_votes)
     
     # Broadcast vote update to all connected clients
     background_tasks.add_task(
         manager.broadcast_vote_update,
         poll_id=poll_id,
         option_id=vote_data.option_id,
-        vote_count=option.vote_count,
+        vote_count=vote_count,
         total_votes=total_votes
     )
     
     return VoteResponse(
-        id=new_vote.id,
-        poll_id=new_vote.poll_id,
-        option_id=new_vote.option_id,
-        voted_at=new_vote.voted_at,
+        id=vote_id,
+        poll_id=poll_id,
+        option_id=vote_data.option_id,
+        voted_at=voted_at,
         message="Vote recorded successfully"
     )
 
 
+async def buffer_vote(
+    poll_id: int,
+    option_id: int,
+    session_id: str,
+    response: Response,
+    db: AsyncSession
+) -> PendingVoteResponse:
+    """Validate a vote and hand it to the vote buffer; answers 202"""
+    # Validate against the cached snapshot instead of querying the options
+    snapshot = await poll_cache.get(poll_id, lambda: load_poll_snapshot(db, poll_id))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Poll not found")
+    if not any(option["id"] == option_id for option in snapshot["options"]):
+        raise HTTPException(
+            status_code=404,
+            detail="Poll option not found or does not belong to this poll"
+        )
+    if not snapshot["is_active"] or is_expired(snapshot):
+        raise HTTPException(status_code=400, detail="This poll is closed")
+    
+    already_voted = vote_buffer.is_pending(poll_id, session_id) or await db.scalar(
+        select(Vote.id).where(Vote.poll_id == poll_id, Vote.session_id == session_id)
+    )
+    vote = PendingVote(poll_id, option_id, session_id, datetime.utcnow())
+    # submit() re-checks the pending set, catching a concurrent request
+    if already_voted or not vote_buffer.submit(vote):
+        voted.add(poll_id, session_id)
+        raise HTTPException(
+            status_code=400,
+            detail="You have already voted on this poll"
+        )
+    voted.add(poll_id, session_id)
+    
+    response.status_code = 202
+    return PendingVoteResponse(poll_id=poll_id, option_id=option_id, voted_at=vote.voted_at)
+
+
 @router.get("/{poll_id}/vote")
-def get_user_vote(
+async def get_user_vote(
     poll_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     session_id: Optional[str] = Cookie(default=None)
 ):
     """Check if session has voted and get their vote"""
     # Check if poll exists
-    poll = db.query(Poll).filter(Poll.id == poll_id).first()
+    poll = (await db.execute(select(Poll.archived_at).where(Poll.id == poll_id))).first()
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     
     if not session_id:
         return {"voted": False, "option_id": None}
     
+    # Accepted by the vote buffer but not written yet
+    pending = vote_buffer.is_pending(poll_id, session_id)
+    if pending is not None:
+        return {
+            "voted": True,
+            "option_id": pending.option_id,
+            "voted_at": pending.voted_at,
+            "pending": True
+        }
+    
+    # Finished polls keep their votes in the archive
+    if poll.archived_at:
+        archived = await find_archived(db, poll_id, "votes", session_id)
+        if not archived:
+            return {"voted": False, "option_id": None}
+        return {
+            "voted": True,
+            "option_id": archived[1],
+            "voted_at": datetime.fromisoformat(archived[2]) if archived[2] else None
+        }
+    
     # Get session's vote
-    vote = db.query(Vote).filter(
+    vote = await db.scalar(select(Vote).where(
         Vote.poll_id == poll_id,
         Vote.session_id == session_id
-    ).first()
+    ))
     
     if not vote:
         return {"voted": False, "option_id": None}
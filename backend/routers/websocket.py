@@ -1,40 +1,141 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Header, WebSocket, WebSocketDisconnect
+from typing import List, Optional
+from routers.admin import require_admin
 from websocket.connection_manager import manager
+from websocket.encoding import JSON, negotiate_encoding
 import uuid
 
 router = APIRouter(tags=["websocket"])
 
 
+def parse_poll_ids(value) -> List[int]:
+    """Parse poll ids from a comma-separated string or a JSON list, ignoring junk"""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return []
+    poll_ids = []
+    for item in value:
+        try:
+            poll_ids.append(int(item))
+        except (TypeError, ValueError):
+            continue
+    return poll_ids
+
+
+def parse_seq(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@router.get("/ws/stats")
+async def websocket_stats(x_admin_token: Optional[str] = Header(default=None)):
+    """Connection counts, queue depths and fan-out latency percentiles (admin only)"""
+    require_admin(x_admin_token)
+    return manager.stats()
+
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    polls: Optional[str] = None,
+    encoding: str = JSON,
+    epoch: Optional[str] = None,
+    seq: Optional[str] = None,
+    batch: bool = False
+):
     """
     WebSocket endpoint for real-time updates.
     Clients connect here to receive live poll updates.
+    
+    Every client receives poll_created events from the feed. Vote and like
+    updates are only sent for polls the client subscribes to, either with
+    /ws?polls=1,2,3 or by sending:
+        {"type": "subscribe", "poll_ids": [1, 2]}
+        {"type": "unsubscribe", "poll_ids": [1]}
+    Both messages accept an optional "feed": true/false to toggle the feed.
+    
+    The server sends {"type": "ping"} to clients that were silent for
+    WS_HEARTBEAT_INTERVAL_SECONDS; clients answer {"type": "pong"} (any
+    message will do). Clients silent for WS_HEARTBEAT_TIMEOUT_SECONDS are
+    disconnected. Handshakes over WS_MAX_CONNECTIONS, or over
+    WS_MAX_CONNECTIONS_PER_IP from one address when that is set, are refused.
+    
+    Server messages are JSON text frames by default; /ws?encoding=msgpack
+    switches them to msgpack binary frames (the welcome message reports the
+    encoding actually used). With /ws?batch=1, events sent within a few
+    milliseconds of each other arrive as one frame holding an array of
+    messages; single events are still sent on their own. The welcome
+    message's "batch" tells whether batching is on.
+    
+    Events sent to clients carry a "seq", increasing within the "epoch" of
+    the worker (both in the welcome message). A client that reconnects with
+    /ws?polls=...&epoch=...&seq=<last seq seen> gets the events it missed
+    on those polls and the feed replayed before the welcome message, or -
+    when the gap is too old - one poll_snapshot per poll after it. The
+    welcome message's "resume" tells which happened; feed_gap means
+    poll_created events may have been lost and the poll list should be
+    refetched.
     """
     # Generate unique client ID
     client_id = str(uuid.uuid4())
     
     # Accept connection
-    await manager.connect(websocket, client_id)
+    encoding = negotiate_encoding(encoding)
+    if not await manager.connect(websocket, client_id, parse_poll_ids(polls or ""), encoding=encoding, batch=batch):
+        return
     
     try:
-        # Send welcome message
+        # Replay missed events (if resuming), then send welcome message
+        resumed = manager.resume(client_id, epoch, parse_seq(seq)) if epoch else None
         await manager.send_personal_message({
             "type": "connected",
             "data": {
                 "client_id": client_id,
-                "message": "Connected to QuickPoll WebSocket"
+                "message": "Connected to QuickPoll WebSocket",
+                "encoding": encoding,
+                "batch": manager.active_connections[client_id].batch_window > 0,
+                "poll_ids": manager.subscribed_polls(client_id),
+                "epoch": manager.epoch,
+                "seq": manager.seq,
+                "resume": resumed
             }
         }, client_id)
+        if resumed and resumed["snapshots"]:
+            await manager.send_resume_snapshots(client_id, resumed["snapshots"])
         
-        # Keep connection alive and listen for messages
+        # Listen for subscription changes; broadcasting happens from the API endpoints
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                message = None  # Ignore frames that aren't JSON
+            # Anything the client sends, pongs included, shows it is alive
+            manager.touch(client_id)
+            if not isinstance(message, dict):
+                continue
+            
+            message_type = message.get("type")
+            poll_ids = parse_poll_ids(message.get("poll_ids", []))
+            feed = message.get("feed")
+            if not isinstance(feed, bool):
+                feed = None
+            
+            if message_type == "subscribe":
+                subscribed = manager.subscribe(client_id, poll_ids, feed=feed)
+            elif message_type == "unsubscribe":
+                subscribed = manager.unsubscribe(client_id, poll_ids)
+                if feed is not None:
+                    subscribed = manager.subscribe(client_id, [], feed=not feed)
+            else:
+                continue
             
-            # Echo back or handle client messages if needed
-            # For now, we just keep the connection alive
-            # The broadcasting happens from the API endpoints
+            await manager.send_personal_message({
+                "type": "subscribed",
+                "data": {"poll_ids": subscribed}
+            }, client_id)
             
     except WebSocketDisconnect:
         manager.disconnect(client_id)
@@ -5,8 +5,12 @@ from .poll import (
     PollDetail,
     PollListResponse,
     PollOptionResponse,
+    PollSessionState,
+    SessionStateResponse,
+    TimelinePoint,
+    PollTimeline,
 )
-from .vote import VoteCreate, VoteResponse
+from .vote import VoteCreate, VoteResponse, PendingVoteResponse
 from .like import LikeCreate, LikeResponse, LikeDeleteResponse
 
 __all__ = [
@@ -16,8 +20,13 @@ __all__ = [
     "PollDetail",
     "PollListResponse",
     "PollOptionResponse",
+    "PollSessionState",
+    "SessionStateResponse",
+    "TimelinePoint",
+    "PollTimeline",
     "VoteCreate",
     "VoteResponse",
+    "PendingVoteResponse",
     "LikeCreate",
     "LikeResponse",
     "LikeDeleteResponse",
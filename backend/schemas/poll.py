@@ -62,6 +62,8 @@ class PollResponse(PollBase):
     """Basic poll response without options"""
     total_votes: int = 0
     total_likes: int = 0
+    user_voted: bool = False
+    user_liked: bool = False
 
 
 class PollDetail(PollBase):
@@ -80,3 +82,35 @@ class PollListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
+
+
+class PollSessionState(BaseModel):
+    """Whether the current session voted on / liked a poll"""
+    poll_id: int
+    voted: bool = False
+    option_id: Optional[int] = None
+    voted_at: Optional[datetime] = None
+    pending: bool = False  # Vote accepted by the vote buffer, not stored yet
+    liked: bool = False
+    liked_at: Optional[datetime] = None
+
+
+class SessionStateResponse(BaseModel):
+    states: List[PollSessionState]  # Polls that don't exist are left out
+
+
+class TimelinePoint(BaseModel):
+    start: datetime
+    counts: List[int]  # Votes per option in this bucket, in option_ids order
+    total: int
+
+
+class PollTimeline(BaseModel):
+    """Votes over time, one point per bucket"""
+    poll_id: int
+    bucket: str  # Bucket size actually used, e.g. "5m" or "1h"
+    start: datetime
+    end: datetime
+    option_ids: List[int]
+    points: List[TimelinePoint]
@@ -15,3 +15,12 @@ class VoteResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class PendingVoteResponse(BaseModel):
+    """Returned with 202 when votes are buffered; the vote is stored shortly after"""
+    poll_id: int
+    option_id: int
+    voted_at: datetime
+    status: str = "pending"
+    message: str = "Vote accepted and will be recorded shortly"
@@ -0,0 +1,42 @@
+"""
+Production entry point: uvicorn with thresholded permessage-deflate.
+
+Equivalent to `uvicorn main:app --host 0.0.0.0 --port $PORT`, except that
+WebSocket messages are only compressed from WS_DEFLATE_MIN_BYTES on (see
+websocket/compression.py), which uvicorn's command line can't configure.
+Client addresses are taken from X-Forwarded-For when the request comes
+from one of FORWARDED_ALLOW_IPS.
+
+    python serve.py
+    python serve.py --port 8000 --workers 4
+"""
+
+import argparse
+import os
+import uvicorn
+from config import settings
+from websocket.compression import DeflateWebSocketProtocol
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the QuickPoll API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        ws=DeflateWebSocketProtocol,
+        ws_per_message_deflate=settings.WS_DEFLATE_ENABLED
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Background services and shared data loaders
@@ -0,0 +1,109 @@
+"""
+Archive of the raw votes and likes of finished polls.
+
+archive_polls.py moves a finished poll's rows out of the hot votes and likes
+tables into archive_segments: blocks of up to ARCHIVE_BLOCK_ROWS rows in
+session id order, each stored as zlib-compressed JSON. The option tallies
+and totals stay on the poll, so only "did this session vote/like?" and
+audits read the archive. A lookup fetches the one block whose
+first_session_id is the largest not above the session id (an index seek on
+the primary key) and scans it.
+
+Block rows:
+    votes: [session_id, option_id, voted_at]
+    likes: [session_id, liked_at]
+"""
+
+import json
+import zlib
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import ArchiveSegment
+
+COMPRESSION_LEVEL = 6
+
+
+def encode_block(rows: List[list]) -> bytes:
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+
+
+def decode_block(data: bytes) -> List[list]:
+    return json.loads(zlib.decompress(data))
+
+
+async def find_archived(db: AsyncSession, poll_id: int, kind: str, session_id: str) -> Optional[list]:
+    """The archived vote or like row of a session, or None"""
+    data = await db.scalar(
+        select(ArchiveSegment.data)
+        .where(
+            ArchiveSegment.poll_id == poll_id,
+            ArchiveSegment.kind == kind,
+            ArchiveSegment.first_session_id <= session_id
+        )
+        .order_by(ArchiveSegment.first_session_id.desc())
+        .limit(1)
+    )
+    if data is None:
+        return None
+    return find_in_block(data, session_id)
+
+
+def find_in_block(data: bytes, session_id: str) -> Optional[list]:
+    # Blocks are ordered by the database's collation, which may not match
+    # Python's string order, so scan rather than bisect
+    for row in decode_block(data):
+        if row[0] == session_id:
+            return row
+    return None
+
+
+async def find_archived_many(
+    db: AsyncSession,
+    poll_ids: Iterable[int],
+    session_id: str
+) -> Dict[Tuple[int, str], list]:
+    """
+    A session's archived vote and like rows on several polls, keyed by
+    (poll_id, kind), with one query: the segment that would hold the
+    session is picked per (poll_id, kind) as in find_archived.
+    """
+    poll_ids = list(poll_ids)
+    if not poll_ids:
+        return {}
+    candidates = (
+        select(
+            ArchiveSegment.poll_id,
+            ArchiveSegment.kind,
+            func.max(ArchiveSegment.first_session_id).label("first_session_id")
+        )
+        .where(ArchiveSegment.poll_id.in_(poll_ids), ArchiveSegment.first_session_id <= session_id)
+        .group_by(ArchiveSegment.poll_id, ArchiveSegment.kind)
+        .subquery()
+    )
+    rows = await db.execute(
+        select(ArchiveSegment.poll_id, ArchiveSegment.kind, ArchiveSegment.data)
+        .join(candidates, and_(
+            ArchiveSegment.poll_id == candidates.c.poll_id,
+            ArchiveSegment.kind == candidates.c.kind,
+            ArchiveSegment.first_session_id == candidates.c.first_session_id
+        ))
+    )
+    found = {}
+    for poll_id, kind, data in rows:
+        row = find_in_block(data, session_id)
+        if row is not None:
+            found[(poll_id, kind)] = row
+    return found
+
+
+async def iter_archived(db: AsyncSession, poll_id: int, kind: str) -> AsyncIterator[List[list]]:
+    """Yield a poll's archived rows one decoded block at a time"""
+    result = await db.stream(
+        select(ArchiveSegment.data)
+        .where(ArchiveSegment.poll_id == poll_id, ArchiveSegment.kind == kind)
+        .order_by(ArchiveSegment.first_session_id)
+        .execution_options(yield_per=8)
+    )
+    async for data in result.scalars():
+        yield decode_block(data)
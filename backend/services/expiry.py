@@ -0,0 +1,143 @@
+"""
+Poll expiry scheduler.
+
+Keeps a min-heap of (expires_at, poll_id) for active polls with a deadline,
+loaded at startup through the (is_active, expires_at) index and updated when
+polls are created, edited, deleted or bulk-imported. At each deadline it
+flips is_active, drops the cached snapshot and publishes poll_closed, which
+every worker forwards to the poll's subscribers and applies to its own cache.
+
+Every worker runs a scheduler; the UPDATE only matches polls that are still
+active, so exactly one of them closes a poll and broadcasts it.
+"""
+
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from database import AsyncSessionLocal
+from models import Poll
+from services.poll_cache import poll_cache
+from websocket.connection_manager import manager
+
+RETRY_SECONDS = 5.0  # Wait after a failed close before trying again
+
+
+class ExpiryScheduler:
+    """Closes polls at their expires_at"""
+
+    def __init__(self):
+        self.heap: List[Tuple[datetime, int]] = []
+        # Current deadline per poll; heap entries that don't match are stale
+        self.deadlines: Dict[int, datetime] = {}
+        self.closed = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, poll_id: int, expires_at: Optional[datetime]):
+        """Set (or with None, clear) the deadline of an active poll"""
+        if expires_at is None:
+            self.deadlines.pop(poll_id, None)
+            return
+        if self.deadlines.get(poll_id) == expires_at:
+            return
+        self.deadlines[poll_id] = expires_at
+        heapq.heappush(self.heap, (expires_at, poll_id))
+        if self.heap[0] == (expires_at, poll_id):
+            self._wake.set()
+
+    def cancel(self, poll_id: int):
+        self.schedule(poll_id, None)
+
+    async def start(self):
+        """Load every active poll with a deadline and start the timer"""
+        self._wake = asyncio.Event()
+        await self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def load(self, first_poll_id: Optional[int] = None, last_poll_id: Optional[int] = None):
+        """Schedule the active polls with a deadline, optionally only those in an id range"""
+        query = select(Poll.id, Poll.expires_at).where(Poll.is_active == True, Poll.expires_at.isnot(None))
+        if first_poll_id is not None:
+            query = query.where(Poll.id.between(first_poll_id, last_poll_id))
+        async with AsyncSessionLocal() as db:
+            for poll_id, expires_at in await db.execute(query):
+                self.schedule(poll_id, expires_at)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def apply_event(self, event: dict):
+        """Backplane listener: forget polls another worker closed, pick up imported ones"""
+        if event.get("type") == "poll_closed":
+            self.cancel(event["data"]["poll_id"])
+        elif event.get("type") == "polls_imported":
+            await self.load(event["data"]["first_poll_id"], event["data"]["last_poll_id"])
+
+    async def _run(self):
+        while True:
+            timeout = None
+            if self.heap:
+                timeout = max((self.heap[0][0] - datetime.utcnow()).total_seconds(), 0)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            due = self._pop_due(datetime.utcnow())
+            if not due:
+                continue
+            try:
+                await self.close(due)
+            except Exception as e:
+                print(f"Closing expired polls failed, retrying in {RETRY_SECONDS}s: {e}")
+                for poll_id, expires_at in due:
+                    if poll_id not in self.deadlines:
+                        self.schedule(poll_id, expires_at)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, poll_id = heapq.heappop(self.heap)
+            if self.deadlines.get(poll_id) == expires_at:
+                del self.deadlines[poll_id]
+                due.append((poll_id, expires_at))
+        return due
+
+    async def close(self, due: List[Tuple[int, datetime]]):
+        """Deactivate the given polls if they are still active and past their deadline"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            closed = (await db.scalars(
+                update(Poll)
+                .where(
+                    Poll.id.in_([poll_id for poll_id, _ in due]),
+                    Poll.is_active == True,
+                    Poll.expires_at <= now
+                )
+                .values(is_active=False, updated_at=now)
+                .returning(Poll.id)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+
+        for poll_id in closed:
+            self.closed += 1
+            await poll_cache.invalidate(poll_id)
+            await manager.broadcast_poll_closed(poll_id, now)
+
+    def stats(self) -> dict:
+        return {"scheduled": len(self.deadlines), "closed": self.closed}
+
+
+# Global expiry scheduler instance
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,101 @@
+"""
+Raw vote export for auditing.
+
+Votes are read through a server-side cursor (stream_results + yield_per)
+and encoded one partition at a time, so memory stays flat no matter how
+many votes a poll has. Archived polls are read from their archive segments
+instead. Session ids are replaced by a keyed hash that is stable within a
+poll but can't be linked across polls.
+"""
+
+import csv
+import hashlib
+import io
+import json
+from typing import AsyncIterator, Dict, Optional
+from sqlalchemy import select
+from config import settings
+from database import AsyncSessionLocal
+from models import Poll, Vote
+from services.archive import iter_archived
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNS = ["option_id", "option_text", "voted_at", "voter"]
+
+
+def hash_session(poll_id: int, session_id: str, key: Optional[bytes] = None) -> str:
+    """Pseudonymous voter id: the session id hashed together with the poll id"""
+    digest = hashlib.blake2b(
+        f"{poll_id}:{session_id}".encode(),
+        key=key or b"",
+        digest_size=16
+    )
+    return digest.hexdigest()
+
+
+def encode_chunk(rows: list, fmt: str) -> str:
+    """Encode a list of export rows (dicts keyed by COLUMNS)"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([row[column] for column in COLUMNS] for row in rows)
+        return buffer.getvalue()
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def export_row(
+    poll_id: int,
+    option_texts: Dict[int, str],
+    option_id: int,
+    voted_at: Optional[str],
+    session_id: str,
+    key: Optional[bytes]
+) -> dict:
+    return {
+        "option_id": option_id,
+        "option_text": option_texts.get(option_id, ""),
+        "voted_at": voted_at,
+        "voter": hash_session(poll_id, session_id, key),
+    }
+
+
+async def export_votes(poll_id: int, option_texts: Dict[int, str], fmt: str) -> AsyncIterator[str]:
+    """
+    Yield the poll's votes as CSV or NDJSON, EXPORT_CHUNK_ROWS at a time.
+    Uses its own session: the response body is sent after the request's
+    dependencies have been closed.
+    """
+    key = settings.EXPORT_HASH_KEY.encode() if settings.EXPORT_HASH_KEY else None
+    if fmt == "csv":
+        yield ",".join(COLUMNS) + "\r\n"
+
+    # No ORDER BY: sorting would have to read every vote before the first
+    # row is sent. The (poll_id, session_id) index serves the filter.
+    query = (
+        select(Vote.option_id, Vote.voted_at, Vote.session_id)
+        .where(Vote.poll_id == poll_id)
+        .execution_options(yield_per=settings.EXPORT_CHUNK_ROWS)
+    )
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(Poll.archived_at).where(Poll.id == poll_id)):
+            async for block in iter_archived(db, poll_id, "votes"):
+                yield encode_chunk([
+                    export_row(poll_id, option_texts, option_id, voted_at, session_id, key)
+                    for session_id, option_id, voted_at in block
+                ], fmt)
+            return
+        
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield encode_chunk([
+                export_row(
+                    poll_id, option_texts, option_id,
+                    voted_at.isoformat() if voted_at else None,
+                    session_id, key
+                )
+                for option_id, voted_at, session_id in partition
+            ], fmt)
+
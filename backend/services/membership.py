@@ -0,0 +1,209 @@
+"""
+In-memory "already voted / already liked" index.
+
+Per poll, the sessions that voted (or liked) are kept as 64-bit fingerprints
+in an open-addressing hash set backed by array('Q'): 8 bytes per slot at a
+load factor between 3/8 and 3/4, i.e. 11-21 bytes per voter - roughly 16 MB
+per million voters, against ~110 MB for a Python set of the session id
+strings (see benchmarks/bench_membership.py).
+
+A hit is treated as a definite duplicate and rejected without touching the
+database; two different sessions of one poll share a fingerprint with
+probability ~n/2^64. A miss only means "possibly new": the write path
+still goes to the database, whose unique constraint stays the final word,
+and learns the session from the result. So an index that lags behind -
+rows written by another worker, or after a restart - costs a round trip,
+never correctness. The one thing that must reach every worker is a removal
+(unlike, poll deletion), which is published through the backplane.
+
+Both indexes are rebuilt from the hot votes and likes tables at startup;
+archived polls have no rows there and so take no memory.
+"""
+
+import hashlib
+from array import array
+from typing import Dict
+from sqlalchemy import select
+from config import settings
+from database import AsyncSessionLocal
+from models import Vote, Like
+
+MIN_CAPACITY = 8
+
+
+def fingerprint(session_id: str) -> int:
+    """Non-zero 64-bit hash of a session id (0 marks an empty slot)"""
+    value = int.from_bytes(hashlib.blake2b(session_id.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class FingerprintSet:
+    """Open-addressing (linear probing) set of 64-bit fingerprints"""
+
+    __slots__ = ("slots", "mask", "size")
+
+    def __init__(self, capacity: int = MIN_CAPACITY):
+        self.slots = array("Q", bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.size = 0
+
+    def _find(self, value: int) -> int:
+        """Slot holding value, or the empty slot where it would go"""
+        slots, mask = self.slots, self.mask
+        index = value & mask
+        while True:
+            current = slots[index]
+            if current == value or current == 0:
+                return index
+            index = (index + 1) & mask
+
+    def __contains__(self, value: int) -> bool:
+        return self.slots[self._find(value)] == value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, value: int) -> bool:
+        """Insert value; False if it was already present"""
+        index = self._find(value)
+        if self.slots[index] == value:
+            return False
+        if (self.size + 1) * 4 > len(self.slots) * 3:
+            self._resize(len(self.slots) * 2)
+            index = self._find(value)
+        self.slots[index] = value
+        self.size += 1
+        return True
+
+    def discard(self, value: int) -> bool:
+        """Remove value; False if it wasn't present"""
+        slots, mask = self.slots, self.mask
+        hole = self._find(value)
+        if slots[hole] != value:
+            return False
+        # Backward-shift deletion: pull later entries of the probe run into
+        # the hole so lookups never need tombstones
+        index = hole
+        while True:
+            index = (index + 1) & mask
+            current = slots[index]
+            if current == 0:
+                break
+            home = current & mask
+            # Move it unless its home slot lies cyclically in (hole, index]
+            if (hole < index and not hole < home <= index) or (hole > index and index < home <= hole):
+                slots[hole] = current
+                hole = index
+        slots[hole] = 0
+        self.size -= 1
+        return True
+
+    def _resize(self, capacity: int):
+        old = self.slots
+        self.slots = array("Q", bytes(8 * capacity))
+        self.mask = capacity - 1
+        for value in old:
+            if value:
+                self.slots[self._find(value)] = value
+
+    def nbytes(self) -> int:
+        return len(self.slots) * self.slots.itemsize
+
+
+class MembershipIndex:
+    """Per-poll fingerprint sets of the sessions that voted on / liked a poll"""
+
+    def __init__(self, kind: str, enabled: bool = True):
+        self.kind = kind
+        self.enabled = enabled
+        self.polls: Dict[int, FingerprintSet] = {}
+        self.hits = 0
+
+    def contains(self, poll_id: int, session_id: str) -> bool:
+        """True if the session definitely voted/liked already"""
+        members = self.polls.get(poll_id)
+        if not self.enabled or members is None or fingerprint(session_id) not in members:
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, poll_id: int, session_id: str):
+        self.add_fingerprint(poll_id, fingerprint(session_id))
+
+    def add_fingerprint(self, poll_id: int, value: int):
+        if not self.enabled:
+            return
+        members = self.polls.get(poll_id)
+        if members is None:
+            members = self.polls[poll_id] = FingerprintSet()
+        members.add(value)
+
+    def discard(self, poll_id: int, session_id: str) -> int:
+        """Forget a session; returns its fingerprint for other workers"""
+        value = fingerprint(session_id)
+        self.discard_fingerprint(poll_id, value)
+        return value
+
+    def discard_fingerprint(self, poll_id: int, value: int):
+        members = self.polls.get(poll_id)
+        if members is not None:
+            members.discard(value)
+
+    def drop(self, poll_id: int):
+        self.polls.pop(poll_id, None)
+
+    async def load(self, model, chunk_rows: int = 10000):
+        """Rebuild from a hot table, streaming (poll_id, session_id) rows"""
+        self.polls.clear()
+        if not self.enabled:
+            return
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                select(model.poll_id, model.session_id).execution_options(yield_per=chunk_rows)
+            )
+            async for partition in result.partitions():
+                for poll_id, session_id in partition:
+                    self.add(poll_id, session_id)
+
+    def stats(self) -> dict:
+        entries = sum(len(members) for members in self.polls.values())
+        nbytes = sum(members.nbytes() for members in self.polls.values())
+        return {
+            "polls": len(self.polls),
+            "entries": entries,
+            "bytes": nbytes,
+            "bytes_per_entry": round(nbytes / entries, 1) if entries else 0,
+            "hits": self.hits,
+        }
+
+
+# Global membership indexes
+voted = MembershipIndex("votes", settings.MEMBERSHIP_INDEX_ENABLED)
+liked = MembershipIndex("likes", settings.MEMBERSHIP_INDEX_ENABLED)
+
+INDEXES = {"votes": voted, "likes": liked}
+
+
+async def load_membership():
+    """Rebuild both indexes at startup"""
+    await voted.load(Vote)
+    await liked.load(Like)
+    print(f"Membership index loaded: votes {voted.stats()}, likes {liked.stats()}")
+
+
+async def apply_event(event: dict):
+    """Backplane listener applying removals made on other workers"""
+    data = event.get("data") or {}
+    event_type = event.get("type")
+    if event_type == "membership_removed":
+        INDEXES[data["kind"]].discard_fingerprint(data["poll_id"], data["fingerprint"])
+    elif event_type == "poll_invalidated" and data.get("deleted"):
+        voted.drop(data["poll_id"])
+        liked.drop(data["poll_id"])
+
+
+def removal_event(kind: str, poll_id: int, value: int) -> dict:
+    return {
+        "type": "membership_removed",
+        "data": {"kind": kind, "poll_id": poll_id, "fingerprint": value}
+    }
@@ -0,0 +1,303 @@
+"""
+Poll snapshot cache.
+
+get_poll reads the session-independent part of a poll (fields, options and
+counters) from here instead of the database. Writers patch or invalidate
+entries; per-session fields (is_owner, user_voted, user_liked) are layered
+on top by the caller, so one snapshot serves every viewer.
+
+The default backend is an in-process TTL+LRU map. Setting POLL_CACHE_URL to
+a redis:// URL shares snapshots between workers (requires the optional
+redis package). With the in-process backend, other workers learn about
+writes through backplane events (see apply_event). On Redis, vote patches
+run as one Lua script so concurrent workers can't overwrite each other's
+counts, and like changes drop the entry; neither extends its TTL.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models import Poll
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+def poll_snapshot(poll: Poll) -> dict:
+    """Session-independent, JSON-safe view of a poll with its options loaded"""
+    return {
+        "id": poll.id,
+        "title": poll.title,
+        "description": poll.description,
+        "created_by": poll.created_by,
+        "owner_session_id": poll.owner_session_id,
+        "created_at": poll.created_at.isoformat(),
+        "updated_at": poll.updated_at.isoformat(),
+        "expires_at": poll.expires_at.isoformat() if poll.expires_at else None,
+        "is_active": poll.is_active,
+        "options": [
+            {
+                "id": opt.id,
+                "option_text": opt.option_text,
+                "vote_count": opt.vote_count
+            }
+            for opt in poll.options
+        ],
+        "total_votes": poll.total_votes,
+        "total_likes": poll.total_likes,
+    }
+
+
+def apply_vote_counts(snapshot: dict, option_id: int, vote_count: int, total_votes: int):
+    """Raise a snapshot's counts to a vote's; counts only grow, so older values never win"""
+    for option in snapshot["options"]:
+        if option["id"] == option_id:
+            option["vote_count"] = max(option["vote_count"], vote_count)
+    snapshot["total_votes"] = max(snapshot["total_votes"], total_votes)
+
+
+# Same as apply_vote_counts, atomically on the stored JSON, keeping its TTL
+PATCH_VOTES_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+local ttl = redis.call('PTTL', KEYS[1])
+if not value or ttl <= 0 then
+    return 0
+end
+local snapshot = cjson.decode(value)
+local option_id, vote_count = tonumber(ARGV[1]), tonumber(ARGV[2])
+for _, option in ipairs(snapshot['options']) do
+    if option['id'] == option_id then
+        option['vote_count'] = math.max(option['vote_count'], vote_count)
+    end
+end
+snapshot['total_votes'] = math.max(snapshot['total_votes'], tonumber(ARGV[3]))
+redis.call('SET', KEYS[1], cjson.encode(snapshot), 'PX', ttl)
+return 1
+"""
+
+
+async def load_poll_snapshot(db: AsyncSession, poll_id: int) -> Optional[dict]:
+    """Cache loader: the poll's snapshot from the database, or None"""
+    poll = await db.get(Poll, poll_id, options=[selectinload(Poll.options)])
+    return poll_snapshot(poll) if poll else None
+
+
+class MemoryCacheBackend:
+    """In-process snapshots with a per-entry TTL and LRU eviction"""
+
+    shared = False
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # poll_id -> (expires, snapshot)
+
+    async def get(self, poll_id: int) -> Optional[dict]:
+        entry = self._entries.get(poll_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[poll_id]
+            return None
+        self._entries.move_to_end(poll_id)
+        return entry[1]
+
+    async def set(self, poll_id: int, snapshot: dict):
+        self._entries[poll_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(poll_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, poll_id: int):
+        self._entries.pop(poll_id, None)
+
+    async def delete_range(self, first_poll_id: int, last_poll_id: int):
+        for poll_id in [poll_id for poll_id in self._entries if first_poll_id <= poll_id <= last_poll_id]:
+            del self._entries[poll_id]
+
+    async def patch_votes(self, poll_id: int, option_id: int, vote_count: int, total_votes: int) -> bool:
+        # In place: the entry keeps its expiry
+        snapshot = await self.get(poll_id)
+        if snapshot is None:
+            return False
+        apply_vote_counts(snapshot, option_id, vote_count, total_votes)
+        return True
+
+    async def patch_likes(self, poll_id: int, total_likes: int) -> bool:
+        snapshot = await self.get(poll_id)
+        if snapshot is None:
+            return False
+        snapshot["total_likes"] = total_likes
+        return True
+
+
+class RedisCacheBackend:
+    """Snapshots shared by every worker, stored as JSON with a Redis TTL"""
+
+    shared = True
+
+    def __init__(self, url: str, ttl_seconds: float):
+        if redis is None:
+            raise RuntimeError("POLL_CACHE_URL requires the redis package")
+        self.client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self._patch_votes = self.client.register_script(PATCH_VOTES_SCRIPT)
+
+    async def get(self, poll_id: int) -> Optional[dict]:
+        value = await self.client.get(f"poll:{poll_id}")
+        return json.loads(value) if value is not None else None
+
+    async def set(self, poll_id: int, snapshot: dict):
+        await self.client.set(
+            f"poll:{poll_id}",
+            json.dumps(snapshot),
+            px=int(self.ttl_seconds * 1000)
+        )
+
+    async def delete(self, poll_id: int):
+        await self.client.delete(f"poll:{poll_id}")
+
+    async def delete_range(self, first_poll_id: int, last_poll_id: int):
+        # Walk the cached keys rather than the id range, which may be far larger
+        keys = []
+        async for key in self.client.scan_iter(match="poll:*", count=1000):
+            if first_poll_id <= int(key.rsplit(b":", 1)[1]) <= last_poll_id:
+                keys.append(key)
+            if len(keys) >= 500:
+                await self.client.delete(*keys)
+                keys.clear()
+        if keys:
+            await self.client.delete(*keys)
+
+    async def patch_votes(self, poll_id: int, option_id: int, vote_count: int, total_votes: int) -> bool:
+        # A read-modify-write here would race other workers' patches
+        return bool(await self._patch_votes(
+            keys=[f"poll:{poll_id}"],
+            args=[option_id, vote_count, total_votes]
+        ))
+
+    async def patch_likes(self, poll_id: int, total_likes: int) -> bool:
+        # Like totals also go down, so a patch from another worker could land
+        # out of order with nothing to tell which is newer; reload instead
+        await self.delete(poll_id)
+        return False
+
+
+class PollSnapshotCache:
+    """Read-through snapshot cache; concurrent misses for a poll share one load"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def get(self, poll_id: int, load: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Return the poll's snapshot, calling load() on a miss. None if it doesn't exist."""
+        snapshot = await self.backend.get(poll_id)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        inflight = self._inflight.get(poll_id)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[poll_id] = future
+        try:
+            snapshot = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Don't warn if nobody else was waiting
+            raise
+        finally:
+            # A write during the load invalidates it by removing the entry;
+            # only cache the result if that didn't happen
+            current = self._inflight.pop(poll_id, None)
+            if current is not None and current is not future:
+                self._inflight[poll_id] = current
+
+        # Release the waiters first, so a failed cache write can't strand them
+        future.set_result(snapshot)
+        if current is future and snapshot is not None:
+            try:
+                await self.backend.set(poll_id, snapshot)
+            except Exception as e:
+                print(f"Poll cache write failed for poll {poll_id}: {e}")
+        return snapshot
+
+    async def put(self, poll_id: int, snapshot: dict):
+        """Replace the cached snapshot after a write that rebuilt it"""
+        self._inflight.pop(poll_id, None)
+        await self.backend.set(poll_id, snapshot)
+
+    async def invalidate(self, poll_id: int):
+        self._inflight.pop(poll_id, None)
+        await self.backend.delete(poll_id)
+
+    async def invalidate_range(self, first_poll_id: int, last_poll_id: int):
+        """Drop every cached poll with an id in [first_poll_id, last_poll_id], e.g. after a bulk import"""
+        for poll_id in [poll_id for poll_id in self._inflight if first_poll_id <= poll_id <= last_poll_id]:
+            del self._inflight[poll_id]
+        await self.backend.delete_range(first_poll_id, last_poll_id)
+
+    async def patch_votes(self, poll_id: int, option_id: int, vote_count: int, total_votes: int):
+        """Apply a vote's new counts to a cached snapshot, if there is one"""
+        if not await self.backend.patch_votes(poll_id, option_id, vote_count, total_votes):
+            # A load already in flight may have read the old counts
+            self._inflight.pop(poll_id, None)
+
+    async def patch_likes(self, poll_id: int, total_likes: int):
+        """Apply a like/unlike's new total to a cached snapshot, if there is one"""
+        if not await self.backend.patch_likes(poll_id, total_likes):
+            self._inflight.pop(poll_id, None)
+
+    async def apply_event(self, event: dict):
+        """
+        Backplane listener keeping in-process caches on other workers in step.
+        A shared backend was already updated by the worker that did the write.
+        """
+        if self.backend.shared:
+            return
+        data = event.get("data") or {}
+        event_type = event.get("type")
+        if event_type == "vote_update":
+            await self.patch_votes(data["poll_id"], data["option_id"], data["vote_count"], data["total_votes"])
+        elif event_type == "like_update":
+            await self.patch_likes(data["poll_id"], data["total_likes"])
+        elif event_type in ("poll_invalidated", "poll_closed"):
+            await self.invalidate(data["poll_id"])
+        elif event_type == "polls_imported":
+            await self.invalidate_range(data["first_poll_id"], data["last_poll_id"])
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "inflight": len(self._inflight)}
+
+
+def is_expired(snapshot: dict) -> bool:
+    expires_at = snapshot["expires_at"]
+    return expires_at is not None and datetime.utcnow() > datetime.fromisoformat(expires_at)
+
+
+def create_cache_backend():
+    if settings.POLL_CACHE_URL:
+        return RedisCacheBackend(settings.POLL_CACHE_URL, settings.POLL_CACHE_TTL_SECONDS)
+    return MemoryCacheBackend(settings.POLL_CACHE_TTL_SECONDS, settings.POLL_CACHE_MAX_ENTRIES)
+
+
+# Global poll snapshot cache instance
+poll_cache = PollSnapshotCache(create_cache_backend())
@@ -0,0 +1,52 @@
+from typing import Optional
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from models import Poll, PollOption
+from services.poll_cache import load_poll_snapshot, poll_cache
+
+
+async def load_poll_counts(poll_id: int) -> Optional[dict]:
+    """
+    Load the current vote count of every option plus the poll totals.
+    Returns None if the poll no longer exists.
+    """
+    async with AsyncSessionLocal() as db:
+        totals = (await db.execute(
+            select(Poll.total_votes, Poll.total_likes, Poll.is_active).where(Poll.id == poll_id)
+        )).first()
+        if totals is None:
+            return None
+        options = (await db.execute(
+            select(PollOption.id, PollOption.vote_count)
+            .where(PollOption.poll_id == poll_id)
+            .order_by(PollOption.id)
+        )).all()
+    
+    return {
+        "poll_id": poll_id,
+        "options": [{"id": option.id, "vote_count": option.vote_count} for option in options],
+        "total_votes": totals.total_votes,
+        "total_likes": totals.total_likes,
+        "is_active": totals.is_active,
+    }
+
+
+async def load_cached_poll_counts(poll_id: int) -> Optional[dict]:
+    """
+    Same as load_poll_counts, but read through the poll snapshot cache, so a
+    wave of clients resuming at once costs at most one load per poll.
+    """
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return await load_poll_snapshot(db, poll_id)
+    
+    snapshot = await poll_cache.get(poll_id, load)
+    if snapshot is None:
+        return None
+    return {
+        "poll_id": poll_id,
+        "options": [{"id": option["id"], "vote_count": option["vote_count"]} for option in snapshot["options"]],
+        "total_votes": snapshot["total_votes"],
+        "total_likes": snapshot["total_likes"],
+        "is_active": snapshot["is_active"],
+    }
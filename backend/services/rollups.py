@@ -0,0 +1,120 @@
+"""
+Vote rollups: per-option vote counts in minute and hour buckets.
+
+Every write path adds its votes with increment_statement() in the same
+transaction as the votes themselves, so a timeline reads O(buckets) rows
+instead of scanning votes. Timelines are served from minute rows for
+sub-hour buckets and from hour rows otherwise, then downsampled to the
+requested bucket size.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import dialect_insert
+from models import VoteRollup
+
+# Timeline bucket sizes in seconds, finest first
+BUCKETS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "6h": 21600,
+    "1d": 86400,
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def naive_utc(moment: datetime) -> datetime:
+    """moment as a naive UTC datetime, like the stored timestamps; naive input is taken as UTC"""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def truncate(moment: datetime, seconds: int) -> datetime:
+    """Start of the bucket of the given size containing moment (UTC-aligned)"""
+    offset = int((moment - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
+
+
+def rollup_increments(votes: Iterable[Tuple[int, int, datetime]]) -> Counter:
+    """Count (poll_id, option_id, voted_at) votes per rollup row"""
+    increments = Counter()
+    for poll_id, option_id, voted_at in votes:
+        increments[(poll_id, "minute", truncate(voted_at, 60), option_id)] += 1
+        increments[(poll_id, "hour", truncate(voted_at, 3600), option_id)] += 1
+    return increments
+
+
+def increment_statement(increments: Counter):
+    """Upsert adding each count to its rollup row"""
+    insert = dialect_insert(VoteRollup).values([
+        {
+            "poll_id": poll_id,
+            "granularity": granularity,
+            "bucket_start": bucket_start,
+            "option_id": option_id,
+            "count": count,
+        }
+        for (poll_id, granularity, bucket_start, option_id), count in increments.items()
+    ])
+    return insert.on_conflict_do_update(
+        index_elements=["poll_id", "granularity", "bucket_start", "option_id"],
+        set_={"count": VoteRollup.count + insert.excluded["count"]}
+    )
+
+
+def choose_bucket(start: datetime, end: datetime, requested: Optional[str], max_points: int) -> Optional[str]:
+    """The requested bucket, coarsened until the range fits in max_points; None if none does"""
+    span = max((end - start).total_seconds(), 1)
+    names = list(BUCKETS)
+    first = names.index(requested) if requested else 0
+    for name in names[first:]:
+        if span / BUCKETS[name] <= max_points:
+            return name
+    return None
+
+
+async def load_timeline(
+    db: AsyncSession,
+    poll_id: int,
+    option_ids: List[int],
+    start: datetime,
+    end: datetime,
+    bucket: str
+) -> List[Tuple[datetime, List[int]]]:
+    """Dense (bucket_start, counts per option) series covering [start, end)"""
+    seconds = BUCKETS[bucket]
+    granularity = "minute" if seconds < 3600 else "hour"
+    start = truncate(start, seconds)
+
+    rows = await db.execute(
+        select(VoteRollup.bucket_start, VoteRollup.option_id, VoteRollup.count)
+        .where(
+            VoteRollup.poll_id == poll_id,
+            VoteRollup.granularity == granularity,
+            VoteRollup.bucket_start >= start,
+            VoteRollup.bucket_start < end
+        )
+    )
+
+    column = {option_id: index for index, option_id in enumerate(option_ids)}
+    points = {}
+    for bucket_start, option_id, count in rows:
+        if option_id not in column:
+            continue
+        counts = points.setdefault(truncate(bucket_start, seconds), [0] * len(option_ids))
+        counts[column[option_id]] += count
+
+    series = []
+    moment = start
+    step = timedelta(seconds=seconds)
+    while moment < end:
+        series.append((moment, points.get(moment, [0] * len(option_ids))))
+        moment += step
+    return series
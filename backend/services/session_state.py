@@ -0,0 +1,84 @@
+"""
+Per-session state (voted / liked) for one or many polls.
+
+One query outer-joins the session's vote and like onto each poll, served by
+the (poll_id, session_id) unique indexes. Votes still in the vote buffer
+and polls whose rows were archived are filled in from there, the latter
+with one more query covering every archived poll.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Poll, Vote, Like
+from services.archive import find_archived_many
+from services.vote_buffer import vote_buffer
+
+
+def empty_state(poll_id: int) -> dict:
+    return {
+        "poll_id": poll_id,
+        "voted": False,
+        "option_id": None,
+        "voted_at": None,
+        "pending": False,
+        "liked": False,
+        "liked_at": None,
+    }
+
+
+async def load_session_state(
+    db: AsyncSession,
+    session_id: Optional[str],
+    poll_ids: Iterable[int]
+) -> Dict[int, dict]:
+    """State of the session on each existing poll, keyed by poll id"""
+    poll_ids = list(poll_ids)
+    if not poll_ids:
+        return {}
+    if not session_id:
+        # No session: nothing voted or liked, only existence to check
+        existing = await db.scalars(select(Poll.id).where(Poll.id.in_(poll_ids)))
+        return {poll_id: empty_state(poll_id) for poll_id in existing}
+
+    rows = await db.execute(
+        select(Poll.id, Poll.archived_at, Vote.option_id, Vote.voted_at, Like.liked_at)
+        .outerjoin(Vote, and_(Vote.poll_id == Poll.id, Vote.session_id == session_id))
+        .outerjoin(Like, and_(Like.poll_id == Poll.id, Like.session_id == session_id))
+        .where(Poll.id.in_(poll_ids))
+    )
+
+    rows = rows.all()
+    archived = await find_archived_many(
+        db, [poll_id for poll_id, archived_at, *_ in rows if archived_at], session_id
+    )
+
+    states = {}
+    for poll_id, archived_at, option_id, voted_at, liked_at in rows:
+        state = states[poll_id] = empty_state(poll_id)
+        if archived_at:
+            archived_vote = archived.get((poll_id, "votes"))
+            if archived_vote:
+                option_id = archived_vote[1]
+                voted_at = datetime.fromisoformat(archived_vote[2]) if archived_vote[2] else None
+            archived_like = archived.get((poll_id, "likes"))
+            if archived_like:
+                liked_at = datetime.fromisoformat(archived_like[1]) if archived_like[1] else None
+            liked = archived_like is not None
+        else:
+            liked = liked_at is not None
+
+        pending = vote_buffer.is_pending(poll_id, session_id)
+        if pending is not None and option_id is None:
+            option_id, voted_at = pending.option_id, pending.voted_at
+            state["pending"] = True
+
+        state.update(
+            voted=option_id is not None,
+            option_id=option_id,
+            voted_at=voted_at,
+            liked=liked,
+            liked_at=liked_at
+        )
+    return states
@@ -0,0 +1,297 @@
+"""
+Buffered vote ingestion (VOTE_BUFFER_ENABLED).
+
+submit_vote validates a vote, appends it to this process's journal file and
+queues it, then answers 202 without touching the database. A background
+flusher writes queued votes every VOTE_BUFFER_FLUSH_MS (or as soon as
+VOTE_BUFFER_MAX_BATCH are waiting) with one multi-row INSERT ... ON CONFLICT
+DO NOTHING and one aggregated counter increment per option, poll and
+timeline rollup.
+
+Duplicates: a session with a pending or stored vote on the poll is rejected
+up front; across workers the unique constraint on (poll_id, session_id) is
+the final word, and counters only count rows that were actually inserted.
+Votes whose poll was closed, expired or archived before the flush are
+dropped too; all of these are counted in dropped_votes.
+
+Durability: each vote is written to the journal (unbuffered, not fsynced)
+before the 202, so it survives the process dying. Journal files are
+flock'd by the worker that owns them; any file nobody holds - left by a
+dead worker or a failed flush - is replayed on the next flush. Replays are
+idempotent thanks to ON CONFLICT DO NOTHING.
+"""
+
+import asyncio
+import fcntl
+import glob
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from config import settings
+from database import AsyncSessionLocal, dialect_insert
+from models import Poll, PollOption, Vote
+from services.rollups import rollup_increments, increment_statement
+
+
+@dataclass
+class PendingVote:
+    poll_id: int
+    option_id: int
+    session_id: str
+    voted_at: datetime
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "poll_id": self.poll_id,
+            "option_id": self.option_id,
+            "session_id": self.session_id,
+            "voted_at": self.voted_at.isoformat(),
+        })
+
+    @classmethod
+    def from_json(cls, line: str) -> "PendingVote":
+        data = json.loads(line)
+        return cls(data["poll_id"], data["option_id"], data["session_id"], datetime.fromisoformat(data["voted_at"]))
+
+
+def _lock(path: str, create: bool = False) -> Optional[int]:
+    """Open and exclusively lock a journal file; None if another worker holds it"""
+    flags = os.O_RDWR | os.O_APPEND | (os.O_CREAT | os.O_EXCL if create else 0)
+    try:
+        fd = os.open(path, flags, 0o600)
+    except FileNotFoundError:
+        # Another worker replayed and removed it first
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class VoteBuffer:
+    """In-memory vote queue with a journal and a batching flusher"""
+
+    def __init__(self, journal_dir: str, flush_interval: float, max_batch: int):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # Votes accepted but not yet flushed: {(poll_id, session_id): PendingVote}
+        self.pending: Dict[Tuple[int, str], PendingVote] = {}
+        self.queued = 0
+        self.flushed_votes = 0
+        self.dropped_votes = 0
+        self._journal_fd: Optional[int] = None
+        self._journal_path: Optional[str] = None
+        self._batch_full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Replay journals left by dead workers, then start the flusher"""
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._open_journal()
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Vote journal replay failed: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._journal_fd is None:
+            return  # Never started
+        try:
+            await self.flush()
+        finally:
+            # Anything unflushed is in the rotated file; the active one is empty
+            os.close(self._journal_fd)
+            os.unlink(self._journal_path)
+            self._journal_fd = self._journal_path = None
+
+    def is_pending(self, poll_id: int, session_id: str) -> Optional[PendingVote]:
+        return self.pending.get((poll_id, session_id))
+
+    def submit(self, vote: PendingVote) -> bool:
+        """Journal and queue a vote. False if the session already has one pending."""
+        key = (vote.poll_id, vote.session_id)
+        if key in self.pending:
+            return False
+        os.write(self._journal_fd, (vote.to_json() + "\n").encode())
+        self.pending[key] = vote
+        self.queued += 1
+        if self.queued >= self.max_batch:
+            self._batch_full.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # The journal files stay behind and are retried next time
+                print(f"Vote buffer flush failed: {e}")
+
+    def _open_journal(self):
+        self._journal_path = os.path.join(
+            self.journal_dir, f"votes-{os.getpid()}-{time.time_ns()}.ndjson"
+        )
+        # Lock before the name matches *.ndjson so no other worker claims it
+        creating = self._journal_path + ".new"
+        self._journal_fd = _lock(creating, create=True)
+        os.rename(creating, self._journal_path)
+
+    async def flush(self):
+        """Write every journal file this worker holds or can claim to the database"""
+        if self.queued:
+            # Swap journals with no await in between, so the closed file
+            # holds exactly the votes queued so far
+            fd, path = self._journal_fd, self._journal_path
+            self._open_journal()
+            self.queued = 0
+            await self._flush_file(fd, path)
+
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.ndjson"))):
+            if path == self._journal_path:
+                continue
+            fd = _lock(path)
+            if fd is not None:
+                print(f"Replaying vote journal {path}")
+                await self._flush_file(fd, path)
+
+    async def _flush_file(self, fd: int, path: str):
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            chunks = []
+            while chunk := os.read(fd, 1 << 20):
+                chunks.append(chunk)
+            votes = [PendingVote.from_json(line) for line in b"".join(chunks).decode().splitlines() if line]
+
+            for start in range(0, len(votes), self.max_batch):
+                await self._write_batch(votes[start:start + self.max_batch])
+
+            # Only forget the file once every vote in it is stored
+            os.unlink(path)
+        finally:
+            # Releases the lock, so a failed file can be claimed and retried
+            os.close(fd)
+
+        for vote in votes:
+            key = (vote.poll_id, vote.session_id)
+            pending = self.pending.get(key)
+            if pending is not None and pending.voted_at == vote.voted_at:
+                del self.pending[key]
+
+    async def _write_batch(self, votes: List[PendingVote]):
+        """Insert a batch of votes and apply the counter increments in one transaction"""
+        async with AsyncSessionLocal() as db:
+            # Drop votes for options/polls deleted, closed or archived since
+            # they were accepted (or, for a replayed journal, long before)
+            polls_open = {
+                option_id: (poll_id, expires_at)
+                for option_id, poll_id, expires_at in (await db.execute(
+                    select(PollOption.id, PollOption.poll_id, Poll.expires_at)
+                    .join(Poll, Poll.id == PollOption.poll_id)
+                    .where(
+                        PollOption.id.in_({vote.option_id for vote in votes}),
+                        Poll.is_active == True,
+                        Poll.archived_at.is_(None)
+                    )
+                )).all()
+            }
+            rows = []
+            for vote in votes:
+                poll_id, expires_at = polls_open.get(vote.option_id, (None, None))
+                if poll_id != vote.poll_id or (expires_at is not None and expires_at <= vote.voted_at):
+                    continue
+                rows.append({
+                    "poll_id": vote.poll_id,
+                    "option_id": vote.option_id,
+                    "session_id": vote.session_id,
+                    "voted_at": vote.voted_at,
+                })
+            inserted = []
+            if rows:
+                inserted = (await db.execute(
+                    dialect_insert(Vote)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["poll_id", "session_id"])
+                    .returning(Vote.poll_id, Vote.option_id, Vote.voted_at)
+                )).all()
+            self.dropped_votes += len(votes) - len(inserted)
+            if not inserted:
+                await db.commit()
+                return
+
+            option_increments = Counter(row.option_id for row in inserted)
+            poll_increments = Counter(row.poll_id for row in inserted)
+            options = PollOption.__table__
+            polls = Poll.__table__
+            await db.execute(
+                update(options)
+                .where(options.c.id == bindparam("option_id"))
+                .values(vote_count=options.c.vote_count + bindparam("increment")),
+                [{"option_id": key, "increment": n} for key, n in option_increments.items()]
+            )
+            await db.execute(
+                update(polls)
+                .where(polls.c.id == bindparam("poll_id"))
+                .values(total_votes=polls.c.total_votes + bindparam("increment")),
+                [{"poll_id": key, "increment": n} for key, n in poll_increments.items()]
+            )
+            await db.execute(increment_statement(rollup_increments(inserted)))
+
+            # Read back the new counts for the cache and the broadcasts
+            option_counts = (await db.execute(
+                select(PollOption.id, PollOption.poll_id, PollOption.vote_count)
+                .where(PollOption.id.in_(option_increments))
+            )).all()
+            poll_totals = dict((await db.execute(
+                select(Poll.id, Poll.total_votes).where(Poll.id.in_(poll_increments))
+            )).all())
+            await db.commit()
+
+        self.flushed_votes += len(inserted)
+        await self._publish(option_counts, poll_totals)
+
+    async def _publish(self, option_counts, poll_totals: Dict[int, int]):
+        from services.poll_cache import poll_cache
+        from websocket.connection_manager import manager
+
+        for option in option_counts:
+            total_votes = poll_totals[option.poll_id]
+            await poll_cache.patch_votes(option.poll_id, option.id, option.vote_count, total_votes)
+            await manager.broadcast_vote_update(
+                poll_id=option.poll_id,
+                option_id=option.id,
+                vote_count=option.vote_count,
+                total_votes=total_votes
+            )
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "flushed_votes": self.flushed_votes,
+            "dropped_votes": self.dropped_votes,
+        }
+
+
+# Global vote buffer, started in main.py only when VOTE_BUFFER_ENABLED
+vote_buffer = VoteBuffer(
+    settings.VOTE_BUFFER_JOURNAL_DIR,
+    flush_interval=settings.VOTE_BUFFER_FLUSH_MS / 1000,
+    max_batch=settings.VOTE_BUFFER_MAX_BATCH
+)
@@ -0,0 +1,52 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+def encode_cursor(created_at: datetime, poll_id: int) -> str:
+    """Encode the sort key of the last poll on a page as an opaque cursor."""
+    return f"{created_at.isoformat()},{poll_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed.
+    """
+    created_at, poll_id = cursor.rsplit(",", 1)
+    return datetime.fromisoformat(created_at), int(poll_id)
+
+
+class CachedCount:
+    """
+    Caches the result of a count query for a bounded number of seconds.
+    Readers may see a value up to ttl_seconds old, which keeps full-table
+    counts off the hot path of paginated list endpoints.
+    """
+    
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[int] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def get(self, compute: Callable[[], Awaitable[int]]) -> int:
+        """
+        Return the cached count, recomputing it once the TTL has expired.
+        Concurrent callers wait for a single recount instead of each running one.
+        """
+        if self._is_fresh():
+            return self._value
+        async with self._lock:
+            if not self._is_fresh():
+                self._value = await compute()
+                self._fetched_at = time.monotonic()
+            return self._value
+    
+    def invalidate(self):
+        """Force the next read to recompute the count"""
+        self._value = None
+    
+    def _is_fresh(self) -> bool:
+        return self._value is not None and time.monotonic() - self._fetched_at < self.ttl_seconds
@@ -0,0 +1,167 @@
+"""
+Shared rate limiter for every router.
+
+Storage is chosen by RATE_LIMIT_STORAGE_URI:
+- lru-memory:// (default): per-process counters capped at
+  RATE_LIMIT_MAX_KEYS; the least recently used keys are dropped first
+- redis://host:port (or any other limits storage URI): counters shared by
+  all workers
+
+RATE_LIMIT_STRATEGY picks the algorithm (sliding-window-counter by default,
+or fixed-window). benchmarks/bench_rate_limit.py measures the per-request
+cost of each combination.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from math import floor
+from typing import Tuple
+from fastapi import Request
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from config import settings
+
+
+class LRUMemoryStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    In-memory counters bounded to max_keys entries. Expired counters are
+    dropped lazily when read, so unlike limits' memory:// storage there is no
+    background timer walking every key. Evicting a key only resets that
+    client's counter, and the least recently seen clients go first.
+    """
+
+    STORAGE_SCHEME = ["lru-memory"]
+
+    def __init__(self, uri: str = None, max_keys: int = 100000, wrap_exceptions: bool = False, **options):
+        self.max_keys = int(max_keys)
+        self._counters: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # key -> (count, expires_at)
+        self._lock = threading.Lock()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _live(self, key: str, now: float):
+        entry = self._counters.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._counters[key]
+            return None
+        self._counters.move_to_end(key)
+        return entry
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        with self._lock:
+            now = time.time()
+            entry = self._live(key, now)
+            if entry is None:
+                entry = (amount, now + expiry)
+            else:
+                entry = (entry[0] + amount, entry[1])
+            self._counters[key] = entry
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return entry[0]
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._live(key, time.time())
+            if entry is None:
+                return 0
+            count = max(entry[0] - amount, 0)
+            self._counters[key] = (count, entry[1])
+            return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[0] if entry else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            now = time.time()
+            entry = self._live(key, now)
+            return entry[1] if entry else now
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int:
+        with self._lock:
+            count = len(self._counters)
+            self._counters.clear()
+            return count
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_window(
+            previous_key, current_key, expiry, now
+        )
+        # Weight the previous window by how much of it still overlaps
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+        # The current window's counter must outlive the next window too
+        self.incr(current_key, 2 * expiry, amount)
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
+
+    def _sliding_window(self, previous_key: str, current_key: str, expiry: int, now: float):
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        previous_ttl = 0.0
+        if previous_count:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+
+def ip_key(request: Request) -> str:
+    """Rate limit by client IP"""
+    return get_remote_address(request)
+
+
+def session_key(request: Request) -> str:
+    """Rate limit by session cookie, falling back to IP for new visitors"""
+    session_id = request.cookies.get("session_id")
+    if session_id:
+        return f"session:{session_id}"
+    return ip_key(request)
+
+
+def storage_options() -> dict:
+    # Options are passed to the storage constructor, so only send ours to ours
+    if settings.RATE_LIMIT_STORAGE_URI.startswith("lru-memory://"):
+        return {"max_keys": settings.RATE_LIMIT_MAX_KEYS}
+    return {}
+
+
+# Global limiter shared by every router; key by IP unless a route overrides it
+limiter = Limiter(
+    key_func=ip_key,
+    default_limits=["100/minute"],
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    storage_options=storage_options()
+)
@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+from typing import Awaitable, Callable, Optional, Set
+from config import settings
+from websocket.encoding import encode_json
+
+# Called with every event published by any worker
+EventHandler = Callable[[dict], Awaitable[None]]
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7999
+
+
+class Backplane:
+    """
+    Pub/sub channel shared by every worker. Each event is published once and
+    delivered to every worker (including the publisher), which fans it out to
+    its own WebSocket clients.
+    """
+
+    def __init__(self):
+        self.on_event: Optional[EventHandler] = None
+
+    async def start(self, on_event: EventHandler):
+        self.on_event = on_event
+
+    async def publish(self, event: dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+    async def _deliver(self, event: dict):
+        if self.on_event is not None:
+            await self.on_event(event)
+
+
+class InProcessBackplane(Backplane):
+    """Delivers events straight back to this process; for tests and single-worker runs"""
+
+    def __init__(self, on_event: Optional[EventHandler] = None):
+        super().__init__()
+        self.on_event = on_event
+
+    async def publish(self, event: dict):
+        await self._deliver(event)
+
+
+class UnixSocketBackplane(Backplane):
+    """
+    Single-node backplane for several workers on one machine. Whichever worker
+    holds the lock file runs a hub on a Unix socket that relays every line it
+    receives to all connected workers; every worker (hub included) connects to
+    it as a client. If the hub worker dies another one takes over the lock.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_event: EventHandler):
+        await super().start(on_event)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+
+    async def publish(self, event: dict):
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            # Hub unavailable (e.g. mid-failover): at least reach our own clients
+            await self._deliver(event)
+            return
+        writer.write((encode_json(event) + "\n").encode())
+        await writer.drain()
+
+    async def _run(self):
+        while True:
+            await self._try_become_hub()
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                while line := await reader.readline():
+                    await self._deliver(json.loads(line))
+            except (ConnectionError, ValueError) as e:
+                print(f"Backplane connection error: {e}")
+            finally:
+                self._writer.close()
+                self._writer = None
+            await asyncio.sleep(0.1)
+
+    async def _try_become_hub(self):
+        if self._server is not None:
+            return
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        self._lock_fd = fd
+        # Holding the lock means any socket file left behind is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._relay, path=self.path)
+        print(f"Backplane hub listening on {self.path}")
+
+    async def _relay(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Hub side: forward every line from one worker to all workers"""
+        self._peers.add(writer)
+        try:
+            while line := await reader.readline():
+                for peer in list(self._peers):
+                    peer.write(line)
+        except (ConnectionError, asyncio.CancelledError):
+            # Worker went away or the hub is shutting down
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+
+class PostgresBackplane(Backplane):
+    """
+    Multi-node backplane over PostgreSQL LISTEN/NOTIFY. Each worker keeps one
+    dedicated asyncpg connection listening on the channel (reconnecting if it
+    drops) and publishes with pg_notify through the regular async engine.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_event: EventHandler):
+        await super().start(on_event)
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def publish(self, event: dict):
+        from sqlalchemy import text
+        from database import async_engine
+
+        payload = encode_json(event)
+        if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+            print(f"Backplane event {event.get('type')} too large for NOTIFY, delivering locally only")
+            await self._deliver(event)
+            return
+        try:
+            async with async_engine.connect() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": payload}
+                )
+                await connection.commit()
+        except Exception as e:
+            print(f"Backplane publish failed, delivering locally only: {e}")
+            await self._deliver(event)
+
+    async def _listen(self):
+        import asyncpg
+
+        loop = asyncio.get_running_loop()
+
+        def on_notify(connection, pid, channel, payload):
+            loop.create_task(self._deliver(json.loads(payload)))
+
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"Backplane listener could not connect: {e}")
+                await asyncio.sleep(1)
+                continue
+            closed = loop.create_future()
+            connection.add_termination_listener(
+                lambda _: closed.done() or closed.set_result(None)
+            )
+            try:
+                await connection.add_listener(self.channel, on_notify)
+                await closed
+            except asyncio.CancelledError:
+                await connection.close()
+                raise
+            print("Backplane listener connection lost, reconnecting")
+            await asyncio.sleep(1)
+
+
+def create_backplane() -> Backplane:
+    """Build the backplane selected by WS_BACKPLANE ("auto" picks postgres on PostgreSQL)"""
+    kind = settings.WS_BACKPLANE
+    if kind == "auto":
+        kind = "postgres" if settings.DATABASE_URL.startswith("postgresql") else "memory"
+
+    if kind == "postgres":
+        return PostgresBackplane(settings.DATABASE_URL, settings.WS_BACKPLANE_CHANNEL)
+    if kind == "unix":
+        return UnixSocketBackplane(settings.WS_BACKPLANE_SOCKET)
+    if kind == "memory":
+        return InProcessBackplane()
+    raise ValueError(f"Unknown WS_BACKPLANE: {settings.WS_BACKPLANE}")
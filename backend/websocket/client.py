@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, Optional
+from fastapi import WebSocket
+from websocket.encoding import JSON, EncodedMessage, encode_batch
+from websocket.metrics import Fanout, LatencyRecorder
+
+
+class OutboundMessage:
+    """A queued message plus the bookkeeping needed to coalesce and time it"""
+    
+    __slots__ = ("message", "coalesce_key", "enqueued_at", "fanout")
+    
+    def __init__(self, message: EncodedMessage, coalesce_key: Optional[Hashable], fanout: Optional[Fanout]):
+        self.message = message
+        self.coalesce_key = coalesce_key
+        self.enqueued_at = time.perf_counter()
+        self.fanout = fanout
+    
+    def finish(self):
+        if self.fanout is not None:
+            self.fanout.done()
+            self.fanout = None
+
+
+class ClientConnection:
+    """
+    One connected WebSocket client with a bounded outbound queue drained by
+    its own writer task, so a slow client only ever delays itself.
+    
+    Messages enqueued with a coalesce_key replace any still-queued message
+    with the same key (e.g. an older count for the same poll option). If the
+    queue is full anyway, enqueue() fails and the client should be evicted.
+    
+    With a batch window, the writer waits that long after the first queued
+    message and sends everything queued by then (up to batch_max messages)
+    as one array frame: fewer frames and send calls, and a batch compresses
+    better than its messages one by one.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        max_queue: int,
+        send_timeout: float,
+        delivery_latency: LatencyRecorder,
+        on_failure: Callable[[str], None],
+        encoding: str = JSON,
+        batch_window: float = 0,
+        batch_max: int = 1,
+        ip: Optional[str] = None,
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.encoding = encoding
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.delivery_latency = delivery_latency
+        self.on_failure = on_failure
+        self.batch_window = batch_window
+        self.ip = ip
+        # Last time anything (e.g. a pong) was received from the client
+        self.last_seen = time.monotonic()
+        self.batch_max = max(batch_max, 1)
+        self.queue: deque = deque()
+        self.pending: Dict[Hashable, OutboundMessage] = {}
+        self.coalesced = 0
+        self.batched = 0  # Messages sent in a frame together with others
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def touch(self):
+        self.last_seen = time.monotonic()
+    
+    def enqueue(self, message: EncodedMessage, coalesce_key: Optional[Hashable] = None, fanout: Optional[Fanout] = None) -> bool:
+        """Queue a message without waiting. Returns False if the queue is full."""
+        if self._closed:
+            return False
+        
+        if coalesce_key is not None and coalesce_key in self.pending:
+            # Newer state supersedes the queued one; keep its place in line
+            queued = self.pending[coalesce_key]
+            queued.message = message
+            queued.finish()
+            queued.fanout = fanout
+            if fanout is not None:
+                fanout.add()
+            self.coalesced += 1
+            return True
+        
+        if len(self.queue) >= self.max_queue:
+            return False
+        
+        outbound = OutboundMessage(message, coalesce_key, fanout)
+        if fanout is not None:
+            fanout.add()
+        if coalesce_key is not None:
+            self.pending[coalesce_key] = outbound
+        self.queue.append(outbound)
+        self._wakeup.set()
+        return True
+    
+    async def _write_loop(self):
+        try:
+            while True:
+                while not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                
+                if self.batch_window > 0 and len(self.queue) < self.batch_max:
+                    # Let messages arriving within the window share the frame
+                    await asyncio.sleep(self.batch_window)
+                
+                batch = []
+                while self.queue and len(batch) < self.batch_max:
+                    outbound = self.queue.popleft()
+                    if outbound.coalesce_key is not None:
+                        self.pending.pop(outbound.coalesce_key, None)
+                    batch.append(outbound)
+                
+                try:
+                    # Encoded once per broadcast and shared by every recipient
+                    frames = [outbound.message.frame(self.encoding) for outbound in batch]
+                    if len(frames) == 1:
+                        frame = frames[0]
+                    else:
+                        frame = encode_batch(frames, self.encoding)
+                        self.batched += len(frames)
+                    if isinstance(frame, bytes):
+                        send = self.websocket.send_bytes(frame)
+                    else:
+                        send = self.websocket.send_text(frame)
+                    await asyncio.wait_for(send, timeout=self.send_timeout)
+                    sent_at = time.perf_counter()
+                    for outbound in batch:
+                        self.delivery_latency.record(sent_at - outbound.enqueued_at)
+                finally:
+                    for outbound in batch:
+                        outbound.finish()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending to client {self.client_id}: {e}")
+            self.on_failure(self.client_id)
+    
+    def close(self, code: int = 1000):
+        """Stop the writer, drop anything still queued and close the socket"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        for outbound in self.queue:
+            outbound.finish()
+        self.queue.clear()
+        self.pending.clear()
+        asyncio.create_task(self._close_socket(code))
+    
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # Already closed by the peer
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Set
+
+
+class PollUpdateCoalescer:
+    """
+    Caps the update rate per poll.
+    
+    The first change to a quiet poll is sent immediately and opens an
+    aggregation window. Changes arriving while the window is open only mark
+    the poll dirty; when the window closes, one snapshot covering all of them
+    is sent and a new window opens. A poll that stays quiet for a whole
+    window goes back to immediate delivery.
+    """
+    
+    def __init__(self, window_seconds: float, send_snapshot: Callable[[int], Awaitable[None]]):
+        self.window_seconds = window_seconds
+        self.send_snapshot = send_snapshot
+        self.windows: Dict[int, asyncio.Task] = {}
+        self.dirty: Set[int] = set()
+    
+    def admit(self, poll_id: int) -> bool:
+        """
+        Return True if an update for this poll should be sent right away,
+        False if it has been folded into the poll's next snapshot.
+        """
+        if self.window_seconds <= 0:
+            return True
+        if poll_id in self.windows:
+            self.dirty.add(poll_id)
+            return False
+        self.windows[poll_id] = asyncio.create_task(self._run_window(poll_id))
+        return True
+    
+    async def _run_window(self, poll_id: int):
+        try:
+            while True:
+                await asyncio.sleep(self.window_seconds)
+                if poll_id not in self.dirty:
+                    break
+                self.dirty.discard(poll_id)
+                try:
+                    await self.send_snapshot(poll_id)
+                except Exception as e:
+                    print(f"Error sending snapshot for poll {poll_id}: {e}")
+        finally:
+            self.windows.pop(poll_id, None)
+            self.dirty.discard(poll_id)
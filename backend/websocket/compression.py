@@ -0,0 +1,65 @@
+"""
+permessage-deflate with a size threshold.
+
+uvicorn's websockets implementation negotiates permessage-deflate with
+every client that offers it and then deflates every message, whatever its
+size. The extension lets the sender leave any message uncompressed (RSV1
+clear), so DeflateWebSocketProtocol only compresses messages of at least
+WS_DEFLATE_MIN_BYTES. Thanks to the compression context shared across a
+connection's messages even ~90-byte vote_updates shrink about 4x (see
+benchmarks/bench_ws_wire.py), so the default only skips tiny frames;
+raising it trades bandwidth for CPU.
+
+uvicorn's --ws option only takes built-in names, so the protocol class is
+passed in code; see serve.py.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.extensions.base import Extension
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.frames import Frame, Opcode
+from config import settings
+
+
+class ThresholdDeflate(Extension):
+    """Negotiated permessage-deflate that skips messages below min_size"""
+
+    def __init__(self, extension: Extension, min_size: int):
+        self.extension = extension
+        self.name = extension.name
+        self.min_size = min_size
+
+    def decode(self, frame: Frame, *, max_size: Optional[int] = None) -> Frame:
+        return self.extension.decode(frame, max_size=max_size)
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in (Opcode.TEXT, Opcode.BINARY) and frame.fin and len(frame.data) < self.min_size:
+            return frame
+        return self.extension.encode(frame)
+
+    def __repr__(self) -> str:
+        return f"ThresholdDeflate({self.extension!r}, min_size={self.min_size})"
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_size: int, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(
+        self,
+        params: Sequence[Tuple[str, Optional[str]]],
+        accepted_extensions: Sequence[Extension]
+    ) -> Tuple[List[Tuple[str, Optional[str]]], Extension]:
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdDeflate(extension, self.min_size)
+
+
+class DeflateWebSocketProtocol(WebSocketProtocol):
+    """uvicorn's websockets protocol with the thresholded deflate extension"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.available_extensions = [ThresholdDeflateFactory(settings.WS_DEFLATE_MIN_BYTES)]
@@ -1,51 +1,474 @@
 from fastapi import WebSocket
-from typing import Dict, List
-import json
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set
+from config import settings
+from websocket.backplane import Backplane, EventHandler, InProcessBackplane
+import asyncio
+from websocket.client import ClientConnection
+from websocket.coalescer import PollUpdateCoalescer
+from websocket.encoding import JSON, EncodedMessage
+from websocket.metrics import Fanout, LatencyRecorder
+import time
+import uuid
+
+# Topic every client is subscribed to by default; carries poll_created events
+FEED_TOPIC = "feed"
+
+
+def poll_topic(poll_id: int) -> str:
+    """Topic carrying vote/like updates for a single poll"""
+    return f"poll:{poll_id}"
+
+
+class ReplayEntry(NamedTuple):
+    """A sequenced event kept for clients that reconnect"""
+    seq: int
+    topic: str
+    message: dict
+    coalesce_key: Optional[Hashable]
 
 
 class ConnectionManager:
-    """Manages WebSocket connections and broadcasts"""
+    """Manages WebSocket connections, topic subscriptions and broadcasts"""
     
     def __init__(self):
-        # Store active connections: {client_id: WebSocket}
-        self.active_connections: Dict[str, WebSocket] = {}
+        # Store active connections: {client_id: ClientConnection}
+        self.active_connections: Dict[str, ClientConnection] = {}
+        # Topic index: {topic: {client_id, ...}}
+        self.subscribers: Dict[str, Set[str]] = {}
+        # Reverse index used for cleanup: {client_id: {topic, ...}}
+        self.client_topics: Dict[str, Set[str]] = {}
+        
+        # Fan-out metrics
+        self.fanout_latency = LatencyRecorder()     # broadcast start -> last recipient sent
+        self.delivery_latency = LatencyRecorder()   # enqueue -> sent, per recipient
+        self.enqueue_latency = LatencyRecorder()    # time broadcast() spends queueing
+        self.evicted_clients = 0
+        
+        # Connection caps: connections (handshakes included) per client address
+        self.connection_count = 0
+        self.connections_per_ip: Dict[str, int] = {}
+        self.rejected_connections = 0
+        # Heartbeat: silent clients are pinged, unresponsive ones reaped
+        self.reaped_connections = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        
+        # Per-poll aggregation of vote/like updates. Needs a loader returning
+        # the poll's current counts (see services.poll_snapshots); without
+        # one, every update is sent immediately.
+        self.snapshot_loader: Optional[Callable[[int], Awaitable[Optional[dict]]]] = None
+        self.coalescer = PollUpdateCoalescer(
+            settings.WS_COALESCE_WINDOW_MS / 1000,
+            send_snapshot=self.broadcast_poll_snapshot
+        )
+        
+        # Events are published once to the backplane and every worker's
+        # manager (this one included) fans them out to its own clients.
+        # In-process until start() installs a shared one.
+        self.backplane: Backplane = InProcessBackplane(self.deliver)
+        # Other in-process consumers of backplane events (e.g. caches)
+        self.listeners: List[EventHandler] = []
+        
+        # Every event sent to clients carries the next sequence number of
+        # this worker's epoch; the latest ones are kept so a client that
+        # reconnects can resume from the last seq it saw (see resume()).
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.replay_buffer: deque = deque(maxlen=settings.WS_REPLAY_BUFFER_SIZE)
+        self.replayed_messages = 0
+        self.resume_snapshots = 0
+        # Loader for the snapshots sent to resuming clients; defaults to
+        # snapshot_loader
+        self.resume_snapshot_loader: Optional[Callable[[int], Awaitable[Optional[dict]]]] = None
+    
+    async def start(self, backplane: Backplane):
+        """Switch to a shared backplane so updates reach clients on every worker"""
+        await self.backplane.stop()
+        self.backplane = backplane
+        await backplane.start(self.deliver)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        await self.backplane.stop()
     
-    async def connect(self, websocket: WebSocket, client_id: str):
-        """Accept and store a new WebSocket connection"""
-        await websocket.accept()
-        self.active_connections[client_id] = websocket
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        poll_ids: Iterable[int] = (),
+        encoding: str = JSON,
+        batch: bool = False
+    ) -> bool:
+        """
+        Accept and store a new WebSocket connection subscribed to the feed.
+        With batch, events close together are sent as one array frame.
+        Over the global or per-address cap, the handshake is refused before
+        the upgrade (HTTP 403) and False is returned.
+        """
+        ip = websocket.client.host if websocket.client else None
+        if not self._reserve(ip):
+            self.rejected_connections += 1
+            await websocket.close(code=1013)  # 1013: try again later
+            return False
+        try:
+            await websocket.accept()
+        except Exception:
+            self._release(ip)
+            raise
+        batch_window = settings.WS_BATCH_WINDOW_MS / 1000 if batch else 0
+        self.active_connections[client_id] = ClientConnection(
+            websocket,
+            client_id,
+            max_queue=settings.WS_SEND_QUEUE_SIZE,
+            send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+            delivery_latency=self.delivery_latency,
+            on_failure=self.disconnect,
+            encoding=encoding,
+            batch_window=batch_window,
+            batch_max=settings.WS_BATCH_MAX_MESSAGES if batch_window > 0 else 1,
+            ip=ip,
+        )
+        self.client_topics[client_id] = set()
+        self._subscribe(client_id, FEED_TOPIC)
+        self.subscribe(client_id, poll_ids)
         print(f"Client {client_id} connected. Total connections: {len(self.active_connections)}")
+        return True
     
-    def disconnect(self, client_id: str):
-        """Remove a WebSocket connection"""
+    def _reserve(self, ip: Optional[str]) -> bool:
+        """Count a new connection against the caps, unless it would exceed one"""
+        if self.connection_count >= settings.WS_MAX_CONNECTIONS:
+            return False
+        per_ip = settings.WS_MAX_CONNECTIONS_PER_IP
+        if per_ip and self.connections_per_ip.get(ip, 0) >= per_ip:
+            return False
+        self.connection_count += 1
+        self.connections_per_ip[ip] = self.connections_per_ip.get(ip, 0) + 1
+        return True
+    
+    def _release(self, ip: Optional[str]):
+        self.connection_count -= 1
+        remaining = self.connections_per_ip.get(ip, 0) - 1
+        if remaining > 0:
+            self.connections_per_ip[ip] = remaining
+        else:
+            self.connections_per_ip.pop(ip, None)
+    
+    def disconnect(self, client_id: str, code: int = 1000):
+        """Remove a WebSocket connection and all of its subscriptions"""
         if client_id in self.active_connections:
-            del self.active_connections[client_id]
+            client = self.active_connections.pop(client_id)
+            client.close(code)
+            self._release(client.ip)
+            for topic in self.client_topics.pop(client_id, set()):
+                self._unsubscribe(client_id, topic)
             print(f"Client {client_id} disconnected. Total connections: {len(self.active_connections)}")
     
+    def touch(self, client_id: str):
+        """Record that a client sent something (any message counts as a pong)"""
+        client = self.active_connections.get(client_id)
+        if client is not None:
+            client.touch()
+    
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                self.reap_idle(time.monotonic())
+            except Exception as e:
+                print(f"WebSocket heartbeat failed: {e}")
+    
+    def reap_idle(self, now: float):
+        """
+        Ping clients silent for a heartbeat interval and disconnect those
+        silent past the timeout, so dead sockets stop costing memory and
+        fan-out long before a send to them fails.
+        """
+        ping = EncodedMessage({"type": "ping"})
+        for client_id, client in list(self.active_connections.items()):
+            idle = now - client.last_seen
+            if idle > settings.WS_HEARTBEAT_TIMEOUT_SECONDS:
+                print(f"Client {client_id} silent for {idle:.0f}s, reaping")
+                self.reaped_connections += 1
+                self.disconnect(client_id, code=1001)  # 1001: going away
+            elif idle >= settings.WS_HEARTBEAT_INTERVAL_SECONDS:
+                if not client.enqueue(ping, coalesce_key="ping"):
+                    self._evict(client_id)
+    
+    def subscribe(self, client_id: str, poll_ids: Iterable[int], feed: Optional[bool] = None) -> List[int]:
+        """
+        Subscribe a client to updates for the given polls (and optionally
+        toggle the feed). Returns the poll ids the client is subscribed to.
+        """
+        if client_id not in self.active_connections:
+            return []
+        for poll_id in poll_ids:
+            if len(self.client_topics[client_id]) > settings.WS_MAX_SUBSCRIPTIONS:
+                break
+            self._subscribe(client_id, poll_topic(poll_id))
+        if feed is True:
+            self._subscribe(client_id, FEED_TOPIC)
+        elif feed is False:
+            self._unsubscribe(client_id, FEED_TOPIC)
+        return self.subscribed_polls(client_id)
+    
+    def unsubscribe(self, client_id: str, poll_ids: Iterable[int]) -> List[int]:
+        """Unsubscribe a client from the given polls"""
+        if client_id not in self.active_connections:
+            return []
+        for poll_id in poll_ids:
+            self._unsubscribe(client_id, poll_topic(poll_id))
+        return self.subscribed_polls(client_id)
+    
+    def subscribed_polls(self, client_id: str) -> List[int]:
+        """Poll ids a client is currently subscribed to"""
+        return sorted(
+            int(topic.split(":", 1)[1])
+            for topic in self.client_topics.get(client_id, ())
+            if topic != FEED_TOPIC
+        )
+    
+    def _subscribe(self, client_id: str, topic: str):
+        self.subscribers.setdefault(topic, set()).add(client_id)
+        self.client_topics[client_id].add(topic)
+    
+    def _unsubscribe(self, client_id: str, topic: str):
+        clients = self.subscribers.get(topic)
+        if clients is not None:
+            clients.discard(client_id)
+            if not clients:
+                del self.subscribers[topic]
+        if client_id in self.client_topics:
+            self.client_topics[client_id].discard(topic)
+    
     async def send_personal_message(self, message: dict, client_id: str):
         """Send a message to a specific client"""
-        if client_id in self.active_connections:
-            websocket = self.active_connections[client_id]
-            await websocket.send_json(message)
+        client = self.active_connections.get(client_id)
+        if client is not None and not client.enqueue(EncodedMessage(message)):
+            self._evict(client_id)
     
-    async def broadcast(self, message: dict, exclude_client: str = None):
-        """Broadcast a message to all connected clients"""
-        disconnected_clients = []
+    async def broadcast(
+        self,
+        message: dict,
+        topic: Optional[str] = None,
+        exclude_client: str = None,
+        coalesce_key: Optional[Hashable] = None
+    ):
+        """
+        Broadcast a message to subscribers of a topic, or to every client if no
+        topic is given. Only queues the message; each client's writer task
+        sends it, so this never waits on a slow client.
+        """
+        started_at = time.perf_counter()
+        if topic is None:
+            recipients = list(self.active_connections)
+        else:
+            recipients = list(self.subscribers.get(topic, ()))
+        
+        encoded = EncodedMessage(message)
+        fanout = Fanout(self.fanout_latency)
+        slow_clients = []
         
-        for client_id, websocket in self.active_connections.items():
+        for client_id in recipients:
             # Skip the client who triggered the event if specified
             if exclude_client and client_id == exclude_client:
                 continue
             
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                print(f"Error sending to client {client_id}: {e}")
-                disconnected_clients.append(client_id)
+            client = self.active_connections.get(client_id)
+            if client is None:
+                continue
+            
+            if not client.enqueue(encoded, coalesce_key, fanout):
+                slow_clients.append(client_id)
+        
+        # Evict clients that can't keep up
+        for client_id in slow_clients:
+            self._evict(client_id)
+        
+        self.enqueue_latency.record(time.perf_counter() - started_at)
+    
+    async def broadcast_sequenced(
+        self,
+        message: dict,
+        topic: str,
+        coalesce_key: Optional[Hashable] = None
+    ):
+        """Stamp an event with the next sequence number, keep it for replay and broadcast it"""
+        self.seq += 1
+        message = {**message, "seq": self.seq}
+        self.replay_buffer.append(ReplayEntry(self.seq, topic, message, coalesce_key))
+        await self.broadcast(message, topic=topic, coalesce_key=coalesce_key)
+    
+    def resume(self, client_id: str, epoch: Optional[str], seq: Optional[int]) -> dict:
+        """
+        Catch up a reconnecting client that last saw event seq of epoch.
+        
+        If every event since then is still buffered, the ones on the client's
+        topics are queued again, keeping only the latest per coalesce key.
+        Otherwise (gap too old, another worker or a restart) the polls it is
+        subscribed to are listed for send_resume_snapshots(), and feed_gap
+        tells it that poll_created events may have been lost.
+        Must run right after connect(), before anything else is queued.
+        """
+        client = self.active_connections.get(client_id)
+        if client is None:
+            return {"replayed": 0, "snapshots": [], "feed_gap": False}
+        topics = self.client_topics[client_id]
         
-        # Clean up disconnected clients
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
+        missed = self._missed_events(epoch, seq)
+        if missed is not None:
+            latest: Dict[Hashable, ReplayEntry] = {}
+            for entry in missed:
+                if entry.topic in topics:
+                    key = entry.coalesce_key if entry.coalesce_key is not None else entry.seq
+                    latest.pop(key, None)
+                    latest[key] = entry
+            # Only replay what fits in the send queue; a snapshot is cheaper anyway
+            if len(latest) <= client.max_queue - len(client.queue):
+                for entry in latest.values():
+                    client.enqueue(EncodedMessage(entry.message), entry.coalesce_key)
+                self.replayed_messages += len(latest)
+                return {"replayed": len(latest), "snapshots": [], "feed_gap": False}
+        
+        return {
+            "replayed": 0,
+            "snapshots": self.subscribed_polls(client_id),
+            "feed_gap": FEED_TOPIC in topics
+        }
+    
+    def _missed_events(self, epoch: Optional[str], seq: Optional[int]) -> Optional[List[ReplayEntry]]:
+        """Buffered events after seq, or None if some of them are gone"""
+        if epoch != self.epoch or seq is None or seq < 0 or seq > self.seq:
+            return None
+        # Buffered seqs are contiguous, ending at self.seq
+        oldest = self.replay_buffer[0].seq if self.replay_buffer else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        return list(islice(self.replay_buffer, seq - oldest + 1, None))
+    
+    async def send_resume_snapshots(self, client_id: str, poll_ids: Iterable[int]):
+        """Send a resuming client the current counts of each poll"""
+        loader = self.resume_snapshot_loader or self.snapshot_loader
+        if loader is None:
+            return
+        for poll_id in poll_ids:
+            snapshot = await loader(poll_id)
+            if client_id not in self.active_connections:
+                return
+            if snapshot is None:
+                continue
+            self.resume_snapshots += 1
+            await self.send_personal_message({
+                "type": "poll_snapshot",
+                "data": snapshot,
+                "seq": self.seq
+            }, client_id)
+    
+    def _evict(self, client_id: str):
+        print(f"Client {client_id} send queue is full, disconnecting slow consumer")
+        self.evicted_clients += 1
+        self.disconnect(client_id, code=1013)  # 1013: try again later
+    
+    def stats(self) -> dict:
+        """Connection counts, queue depths and fan-out latency percentiles"""
+        queue_depths = [len(client.queue) for client in self.active_connections.values()]
+        return {
+            "connections": len(self.active_connections),
+            "topics": len(self.subscribers),
+            "queued_messages": sum(queue_depths),
+            "max_queue_depth": max(queue_depths, default=0),
+            "coalesced_messages": sum(client.coalesced for client in self.active_connections.values()),
+            "batched_messages": sum(client.batched for client in self.active_connections.values()),
+            "evicted_clients": self.evicted_clients,
+            "reaped_connections": self.reaped_connections,
+            "rejected_connections": self.rejected_connections,
+            "client_addresses": len(self.connections_per_ip),
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replay_buffer": len(self.replay_buffer),
+            "replayed_messages": self.replayed_messages,
+            "resume_snapshots": self.resume_snapshots,
+            "fanout": self.fanout_latency.summary(),
+            "delivery": self.delivery_latency.summary(),
+            "enqueue": self.enqueue_latency.summary(),
+        }
+    
+    async def publish(self, message: dict):
+        """Send an event to every worker through the backplane"""
+        await self.backplane.publish(message)
+    
+    async def deliver(self, message: dict):
+        """Fan out an event received from the backplane to this worker's clients"""
+        for listener in self.listeners:
+            await listener(message)
+        
+        message_type = message.get("type")
+        if message_type == "poll_created":
+            await self.broadcast_sequenced(message, topic=FEED_TOPIC)
+        elif message_type == "poll_closed":
+            await self.broadcast_sequenced(message, topic=poll_topic(message["data"]["poll_id"]))
+        elif message_type in ("vote_update", "like_update"):
+            poll_id = message["data"]["poll_id"]
+            if not self._admit_poll_update(poll_id):
+                return
+            await self.broadcast_sequenced(
+                message,
+                topic=poll_topic(poll_id),
+                coalesce_key=(message_type, poll_id, message["data"].get("option_id"))
+            )
+    
+    def _admit_poll_update(self, poll_id: int) -> bool:
+        """Whether a vote/like update should go out now rather than in the next snapshot"""
+        if self.snapshot_loader is None:
+            return True
+        return self.coalescer.admit(poll_id)
+    
+    async def broadcast_poll_snapshot(self, poll_id: int):
+        """
+        Broadcast every option's count and the totals for a poll. Each worker
+        coalesces and loads snapshots itself, so these are sent locally only.
+        """
+        snapshot = await self.snapshot_loader(poll_id)
+        if snapshot is None:
+            return
+        message = {
+            "type": "poll_snapshot",
+            "data": snapshot
+        }
+        await self.broadcast_sequenced(
+            message,
+            topic=poll_topic(poll_id),
+            coalesce_key=("poll_snapshot", poll_id)
+        )
+    
+    async def publish_poll_invalidated(self, poll_id: int, deleted: bool = False):
+        """Tell every worker a poll was edited or deleted; not sent to clients"""
+        await self.publish({
+            "type": "poll_invalidated",
+            "data": {"poll_id": poll_id, "deleted": deleted}
+        })
+    
+    async def publish_polls_imported(self, first_poll_id: int, last_poll_id: int):
+        """Tell every worker polls in an id range were bulk-imported; not sent to clients"""
+        await self.publish({
+            "type": "polls_imported",
+            "data": {"first_poll_id": first_poll_id, "last_poll_id": last_poll_id}
+        })
+    
+    async def broadcast_poll_closed(self, poll_id: int, closed_at: datetime):
+        """Broadcast when a poll is closed, at its deadline or by its owner"""
+        message = {
+            "type": "poll_closed",
+            "data": {
+                "poll_id": poll_id,
+                "closed_at": closed_at.isoformat()
+            }
+        }
+        await self.publish(message)
     
     async def broadcast_poll_created(self, poll_data: dict):
         """Broadcast when a new poll is created"""
@@ -53,7 +476,7 @@ class ConnectionManager:
             "type": "poll_created",
             "data": poll_data
         }
-        await self.broadcast(message)
+        await self.publish(message)
     
     async def broadcast_vote_update(self, poll_id: int, option_id: int, vote_count: int, total_votes: int):
         """Broadcast when a vote is cast"""
@@ -66,7 +489,7 @@ class ConnectionManager:
                 "total_votes": total_votes
             }
         }
-        await self.broadcast(message)
+        await self.publish(message)
     
     async def broadcast_like_update(self, poll_id: int, total_likes: int, action: str):
         """Broadcast when a poll is liked/unliked"""
@@ -78,7 +501,7 @@ class ConnectionManager:
                 "action": action  # "liked" or "unliked"
             }
         }
-        await self.broadcast(message)
+        await self.publish(message)
 
 
 # Global connection manager instance
@@ -0,0 +1,76 @@
+"""
+Wire encodings for WebSocket messages.
+
+A broadcast is serialized at most once per encoding, no matter how many
+clients receive it. orjson and msgpack are optional: without orjson the
+stdlib json module is used, and without msgpack clients asking for it are
+served JSON instead.
+"""
+
+import json
+from typing import Dict, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+
+def available_encodings():
+    return [JSON, MSGPACK] if msgpack is not None else [JSON]
+
+
+def negotiate_encoding(requested: str) -> str:
+    """Pick the wire encoding for a client, falling back to JSON"""
+    if requested in available_encodings():
+        return requested
+    return JSON
+
+
+def encode_json(message: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"))
+
+
+def encode_msgpack(message: dict) -> bytes:
+    return msgpack.packb(message)
+
+
+def encode_batch(frames: List[Union[str, bytes]], encoding: str) -> Union[str, bytes]:
+    """Join already-serialized messages into one array frame without re-encoding them"""
+    if encoding == MSGPACK:
+        return msgpack.Packer().pack_array_header(len(frames)) + b"".join(frames)
+    return "[" + ",".join(frames) + "]"
+
+
+ENCODERS = {
+    JSON: encode_json,
+    MSGPACK: encode_msgpack,
+}
+
+
+class EncodedMessage:
+    """A message plus its serialized frames, each built on first use"""
+    
+    __slots__ = ("message", "_frames")
+    
+    def __init__(self, message: dict):
+        self.message = message
+        self._frames: Dict[str, Union[str, bytes]] = {}
+    
+    def frame(self, encoding: str) -> Union[str, bytes]:
+        """Serialized message: str for JSON (text frame), bytes for msgpack (binary frame)"""
+        frame = self._frames.get(encoding)
+        if frame is None:
+            frame = ENCODERS[encoding](self.message)
+            self._frames[encoding] = frame
+        return frame
@@ -0,0 +1,56 @@
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyRecorder:
+    """Keeps the most recent latency samples and reports percentiles over them"""
+    
+    def __init__(self, max_samples: int = 10000):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Count plus p50/p90/p99/max in milliseconds"""
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(max(self.samples) if self.samples else None),
+        }
+
+
+class Fanout:
+    """
+    Tracks one broadcast until every recipient has sent (or dropped) it, then
+    records the total fan-out time.
+    """
+    
+    __slots__ = ("started_at", "remaining", "recorder")
+    
+    def __init__(self, recorder: LatencyRecorder):
+        self.started_at = time.perf_counter()
+        self.remaining = 0
+        self.recorder = recorder
+    
+    def add(self):
+        self.remaining += 1
+    
+    def done(self):
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.recorder.record(time.perf_counter() - self.started_at)
@@ -14,6 +14,7 @@ import { PollResults } from "@/components/polls/PollResults";
 import { LikeButton } from "@/components/polls/LikeButton";
 import Link from "next/link";
 import PixelBlast from "@/components/PixelBlast";
+import { useWebSocketContext } from "@/components/WebSocketProvider";
 
 export default function PollPage() {
   const params = useParams();
@@ -21,6 +22,15 @@ export default function PollPage() {
   const [poll, setPoll] = useState<PollDetail | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const { subscribe, unsubscribe } = useWebSocketContext();
+
+  // Subscribe to vote/like updates for this poll
+  useEffect(() => {
+    if (!params.id) return;
+    const pollId = parseInt(params.id as string);
+    subscribe([pollId]);
+    return () => unsubscribe([pollId]);
+  }, [params.id, subscribe, unsubscribe]);
 
   // Listen for WebSocket real-time updates
   useEffect(() => {
@@ -40,12 +50,43 @@ export default function PollPage() {
       }
     };
 
+    // Snapshots carry every count, so apply them without refetching
+    const handleSnapshot = (event: any) => {
+      const data = event.detail;
+      if (poll && data.poll_id === poll.id) {
+        const counts = new Map<number, number>(
+          data.options.map((opt: { id: number; vote_count: number }) => [opt.id, opt.vote_count])
+        );
+        setPoll({
+          ...poll,
+          options: poll.options.map((opt) => ({
+            ...opt,
+            vote_count: counts.get(opt.id) ?? opt.vote_count,
+          })),
+          total_votes: data.total_votes,
+          total_likes: data.total_likes,
+          is_active: data.is_active ?? poll.is_active,
+        });
+      }
+    };
+
+    const handlePollClosed = (event: any) => {
+      const data = event.detail;
+      if (poll && data.poll_id === poll.id) {
+        setPoll({ ...poll, is_active: false });
+      }
+    };
+
     window.addEventListener("vote_update", handleVoteUpdate);
     window.addEventListener("like_update", handleLikeUpdate);
+    window.addEventListener("poll_snapshot", handleSnapshot);
+    window.addEventListener("poll_closed", handlePollClosed);
 
     return () => {
       window.removeEventListener("vote_update", handleVoteUpdate);
       window.removeEventListener("like_update", handleLikeUpdate);
+      window.removeEventListener("poll_snapshot", handleSnapshot);
+      window.removeEventListener("poll_closed", handlePollClosed);
     };
   }, [poll]);
 
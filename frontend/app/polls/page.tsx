@@ -14,7 +14,7 @@ import { Input } from "@/components/ui/input";
 
 export default function PollsPage() {
   const { polls, isLoading, error, refresh } = usePolls();
-  const { isConnected } = useWebSocketContext();
+  const { isConnected, subscribe, unsubscribe } = useWebSocketContext();
   const [mounted, setMounted] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
 
@@ -29,6 +29,13 @@ export default function PollsPage() {
     setMounted(true);
   }, []);
 
+  // Only receive vote/like updates for the polls on screen
+  useEffect(() => {
+    const pollIds = polls.map((poll) => poll.id);
+    subscribe(pollIds);
+    return () => unsubscribe(pollIds);
+  }, [polls, subscribe, unsubscribe]);
+
   // Listen for WebSocket events
   useEffect(() => {
     const handlePollCreated = () => {
@@ -47,13 +54,17 @@ export default function PollsPage() {
     };
 
     window.addEventListener("poll_created", handlePollCreated);
+    window.addEventListener("feed_resync", handlePollCreated);
     window.addEventListener("vote_update", handleVoteUpdate);
     window.addEventListener("like_update", handleLikeUpdate);
+    window.addEventListener("poll_snapshot", handleVoteUpdate);
 
     return () => {
       window.removeEventListener("poll_created", handlePollCreated);
+      window.removeEventListener("feed_resync", handlePollCreated);
       window.removeEventListener("vote_update", handleVoteUpdate);
       window.removeEventListener("like_update", handleLikeUpdate);
+      window.removeEventListener("poll_snapshot", handleVoteUpdate);
     };
   }, [refresh]);
 
@@ -1,17 +1,21 @@
 "use client";
 
-import { createContext, useContext, useEffect, ReactNode } from "react";
+import { createContext, useCallback, useContext, ReactNode } from "react";
 import { useWebSocket } from "@/hooks/useWebSocket";
 import { WebSocketMessage } from "@/types/poll";
 
 interface WebSocketContextType {
   isConnected: boolean;
   lastMessage: WebSocketMessage | null;
+  subscribe: (pollIds: number[]) => void;
+  unsubscribe: (pollIds: number[]) => void;
 }
 
 const WebSocketContext = createContext<WebSocketContextType>({
   isConnected: false,
   lastMessage: null,
+  subscribe: () => {},
+  unsubscribe: () => {},
 });
 
 export function useWebSocketContext() {
@@ -23,42 +27,57 @@ interface WebSocketProviderProps {
 }
 
 export function WebSocketProvider({ children }: WebSocketProviderProps) {
-  const { isConnected, lastMessage } = useWebSocket();
-
-  useEffect(() => {
-    if (lastMessage) {
-      console.log("WebSocket message received:", lastMessage);
-      
-      // Handle different message types
-      switch (lastMessage.type) {
-        case "connected":
-          console.log("Connected to WebSocket server");
-          break;
-        case "poll_created":
-          console.log("New poll created:", lastMessage.data);
-          // Trigger a custom event that components can listen to
-          window.dispatchEvent(
-            new CustomEvent("poll_created", { detail: lastMessage.data })
-          );
-          break;
-        case "vote_update":
-          console.log("Vote update:", lastMessage.data);
-          window.dispatchEvent(
-            new CustomEvent("vote_update", { detail: lastMessage.data })
-          );
-          break;
-        case "like_update":
-          console.log("Like update:", lastMessage.data);
-          window.dispatchEvent(
-            new CustomEvent("like_update", { detail: lastMessage.data })
-          );
-          break;
-      }
+  // Dispatch every message as a window event components can listen to
+  const handleMessage = useCallback((message: WebSocketMessage) => {
+    console.log("WebSocket message received:", message);
+    
+    // Handle different message types
+    switch (message.type) {
+      case "connected":
+        console.log("Connected to WebSocket server");
+        if (message.data.resume?.feed_gap) {
+          // Too long offline to replay the feed; new polls may be missing
+          window.dispatchEvent(new CustomEvent("feed_resync"));
+        }
+        break;
+      case "poll_created":
+        console.log("New poll created:", message.data);
+        // Trigger a custom event that components can listen to
+        window.dispatchEvent(
+          new CustomEvent("poll_created", { detail: message.data })
+        );
+        break;
+      case "vote_update":
+        console.log("Vote update:", message.data);
+        window.dispatchEvent(
+          new CustomEvent("vote_update", { detail: message.data })
+        );
+        break;
+      case "like_update":
+        console.log("Like update:", message.data);
+        window.dispatchEvent(
+          new CustomEvent("like_update", { detail: message.data })
+        );
+        break;
+      case "poll_snapshot":
+        // Aggregated counts for a busy poll (replaces many vote/like updates)
+        window.dispatchEvent(
+          new CustomEvent("poll_snapshot", { detail: message.data })
+        );
+        break;
+      case "poll_closed":
+        // The poll reached its deadline or was closed by its owner
+        window.dispatchEvent(
+          new CustomEvent("poll_closed", { detail: message.data })
+        );
+        break;
     }
-  }, [lastMessage]);
+  }, []);
+
+  const { isConnected, lastMessage, subscribe, unsubscribe } = useWebSocket(handleMessage);
 
   return (
-    <WebSocketContext.Provider value={{ isConnected, lastMessage }}>
+    <WebSocketContext.Provider value={{ isConnected, lastMessage, subscribe, unsubscribe }}>
       {children}
     </WebSocketContext.Provider>
   );
@@ -5,7 +5,7 @@ import { Button } from "@/components/ui/button";
 import { RadioGroup, RadioGroupItem } from "@/components/ui/radio-group";
 import { Label } from "@/components/ui/label";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import { CheckCircle2 } from "lucide-react";
+import { CheckCircle2, Lock } from "lucide-react";
 import { PollDetail } from "@/types/poll";
 import { useVote } from "@/hooks/useVote";
 
@@ -29,7 +29,8 @@ export function VotingInterface({ poll, onVoteSuccess }: VotingInterfaceProps) {
       }
     };
 
-    if (!poll.user_voted) {
+    // user_voted comes with the poll; only the chosen option needs a lookup
+    if (poll.user_voted) {
       checkExistingVote();
     }
   }, [poll.id, poll.user_voted, checkVoteStatus]);
@@ -68,6 +69,24 @@ export function VotingInterface({ poll, onVoteSuccess }: VotingInterfaceProps) {
     );
   }
 
+  if (poll.is_active === false || poll.is_expired) {
+    return (
+      <Card className="bg-white/5 border-white/10">
+        <CardHeader>
+          <div className="flex items-center gap-2">
+            <Lock className="h-5 w-5 text-white/70" />
+            <CardTitle className="text-lg text-white">This poll is closed</CardTitle>
+          </div>
+        </CardHeader>
+        <CardContent>
+          <p className="text-sm text-white/70">
+            Voting has ended. Check the final results below.
+          </p>
+        </CardContent>
+      </Card>
+    );
+  }
+
   return (
     <Card className="animate-fade-in bg-white/5 border-white/10">
       <CardHeader>
@@ -3,26 +3,70 @@ import { WebSocketMessage } from "@/types/poll";
 
 const WS_URL = process.env.NEXT_PUBLIC_WS_URL || "ws://localhost:8000";
 
-export function useWebSocket() {
+export function useWebSocket(onMessage?: (message: WebSocketMessage) => void) {
   const [isConnected, setIsConnected] = useState(false);
   const [lastMessage, setLastMessage] = useState<WebSocketMessage | null>(null);
   const ws = useRef<WebSocket | null>(null);
   const reconnectTimeout = useRef<NodeJS.Timeout | undefined>(undefined);
+  // Poll ids to receive vote/like updates for; replayed after every reconnect
+  const subscriptions = useRef<Set<number>>(new Set());
+  // Server epoch and the last event seq seen, sent back on reconnect so the
+  // server replays only what was missed
+  const epoch = useRef<string | null>(null);
+  const lastSeq = useRef(0);
+  // Called for every message; with batching one frame can carry several,
+  // which lastMessage alone would collapse into the last one
+  const messageHandler = useRef(onMessage);
+  messageHandler.current = onMessage;
 
   const connect = useCallback(() => {
     try {
-      ws.current = new WebSocket(`${WS_URL}/ws`);
+      // Events close together arrive as one array frame
+      const params = new URLSearchParams({ batch: "1" });
+      if (subscriptions.current.size > 0) {
+        params.set("polls", Array.from(subscriptions.current).join(","));
+      }
+      if (epoch.current) {
+        params.set("epoch", epoch.current);
+        params.set("seq", String(lastSeq.current));
+      }
+      ws.current = new WebSocket(`${WS_URL}/ws?${params}`);
 
       ws.current.onopen = () => {
         console.log("WebSocket connected");
         setIsConnected(true);
+
+        if (subscriptions.current.size > 0) {
+          ws.current?.send(
+            JSON.stringify({
+              type: "subscribe",
+              poll_ids: Array.from(subscriptions.current),
+            })
+          );
+        }
       };
 
       ws.current.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data);
-          console.log("WebSocket message:", message);
-          setLastMessage(message);
+          const payload = JSON.parse(event.data);
+          const messages: WebSocketMessage[] = Array.isArray(payload) ? payload : [payload];
+          for (const message of messages) {
+            if (message.type === "ping") {
+              // Server heartbeat; silent clients get disconnected
+              ws.current?.send(JSON.stringify({ type: "pong" }));
+              continue;
+            }
+            console.log("WebSocket message:", message);
+            if (message.type === "connected") {
+              // Replayed events (if any) came before this; count from here
+              epoch.current = message.data.epoch;
+              lastSeq.current = message.data.seq;
+            } else if (message.seq !== undefined && message.seq > lastSeq.current) {
+              lastSeq.current = message.seq;
+            }
+            messageHandler.current?.(message);
+          }
+          setLastMessage(messages[messages.length - 1]);
         } catch (error) {
           console.error("Failed to parse WebSocket message:", error);
         }
@@ -63,6 +107,22 @@ export function useWebSocket() {
     }
   }, []);
 
+  const subscribe = useCallback(
+    (pollIds: number[]) => {
+      pollIds.forEach((id) => subscriptions.current.add(id));
+      sendMessage({ type: "subscribe", poll_ids: pollIds });
+    },
+    [sendMessage]
+  );
+
+  const unsubscribe = useCallback(
+    (pollIds: number[]) => {
+      pollIds.forEach((id) => subscriptions.current.delete(id));
+      sendMessage({ type: "unsubscribe", poll_ids: pollIds });
+    },
+    [sendMessage]
+  );
+
   useEffect(() => {
     // Only connect on client side
     if (typeof window !== 'undefined') {
@@ -78,6 +138,8 @@ export function useWebSocket() {
     isConnected,
     lastMessage,
     sendMessage,
+    subscribe,
+    unsubscribe,
     connect,
     disconnect,
   };
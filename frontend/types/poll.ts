@@ -12,12 +12,17 @@ export interface Poll {
   created_at: string;
   total_votes: number;
   total_likes: number;
+  user_voted?: boolean;
+  user_liked?: boolean;
 }
 
 export interface PollDetail extends Poll {
   options: PollOption[];
   user_voted: boolean;
   user_liked: boolean;
+  expires_at?: string | null;
+  is_active?: boolean;
+  is_expired?: boolean;
 }
 
 export interface PollCreate {
@@ -31,10 +36,11 @@ export interface VoteCreate {
 }
 
 export interface VoteResponse {
-  id: number;
+  id?: number; // Absent while the vote is pending (buffered, HTTP 202)
   poll_id: number;
   option_id: number;
   voted_at: string;
+  status?: "pending";
   message: string;
 }
 
@@ -46,6 +52,15 @@ export interface LikeResponse {
 }
 
 export interface WebSocketMessage {
-  type: "connected" | "poll_created" | "vote_update" | "like_update";
+  type:
+    | "connected"
+    | "subscribed"
+    | "poll_created"
+    | "vote_update"
+    | "like_update"
+    | "poll_snapshot"
+    | "poll_closed"
+    | "ping";
   data: any;
+  seq?: number; // Per-server event sequence number, used to resume after a reconnect
 }